@@ -3,7 +3,6 @@ import os
 import time
 import requests
 import streamlit as st
-from supabase import create_client, Client
 from PIL import Image
 import base64
 import streamlit.components.v1 as components
@@ -62,46 +61,18 @@ inject_apple_icon("logo.png")
 port = int(os.environ.get("PORT", 10000))
 
 def safe_import(module_name):
+    """分頁模組延遲載入：第一次用到時才 import (見 views/lazy_views.py)"""
     try:
-        if module_name == "ads_manager":
-            from views import ads_manager
-            return ads_manager
-        elif module_name == "tab_life_map":
-            from views import tab_life_map
-            return tab_life_map
-        elif module_name == "tab_divination":
-            from views import tab_divination
-            return tab_divination
-        elif module_name == "tab_family_matrix":
-            from views import tab_family_matrix
-            return tab_family_matrix
-        elif module_name == "tab_journal":
-            from views import tab_journal
-            return tab_journal
-        elif module_name == "tab_member":
-            from views import tab_member
-            return tab_member
-        elif module_name == "auth_ui":
-            from views import auth_ui
-            return auth_ui
+        return lazy_views.load(module_name)
     except Exception as e:
         # 這裡改成 warning，避免 error 區塊太大影響視覺
         st.warning(f"⚠️ {module_name} 載入延遲: {e}")
     return None
 
-tab_life_map = safe_import("tab_life_map")
-tab_divination = safe_import("tab_divination")
-tab_family_matrix = safe_import("tab_family_matrix")
-tab_journal = safe_import("tab_journal")
-tab_member = safe_import("tab_member")
-auth_ui = safe_import("auth_ui")
-ads_manager = safe_import("ads_manager")
-
-def get_secret_value(section: str, key: str, default=None):
-    env_key = f"{section}_{key}".upper()
-    value = os.environ.get(env_key)
-    if value: return value
-    return st.secrets.get(section, {}).get(key, default)
+# 連線設定與資料快取統一由 views/data_access 管理
+from views import data_access, lazy_views
+import pds_transliteration
+get_secret_value = data_access.get_secret_value
 
 # ==========================================
 # 2. 持久化登入與資料庫工具 (🛡️ 終極資安防護版)
@@ -118,14 +89,7 @@ def _try_restore_login():
     # 🛡️ 關閉網址還原功能。重新整理時，請用戶再按一次綠色 LINE 按鈕最安全！
     return False
 
-@st.cache_resource
-def init_connection():
-    url = get_secret_value("supabase", "url")
-    key = get_secret_value("supabase", "key")
-    if url and key: return create_client(url, key)
-    return None
-
-supabase = init_connection()
+supabase = data_access.get_client()
 
 # --- LINE 登入相關函式 ---
 def get_line_auth_url():
@@ -165,22 +129,13 @@ def sync_legacy_records(line_id, display_name):
         supabase.table("users").update({"line_user_id": line_id}).eq("username", display_name).is_("line_user_id", None).execute()
         supabase.table("saved_charts").update({"line_user_id": line_id}).eq("username", display_name).is_("line_user_id", None).execute()
     except Exception: pass
+    finally:
+        data_access.invalidate_user(line_id)
+        data_access.invalidate_saved_charts(line_id)
 # ==========================================
-# ★ 新增：中文轉威妥瑪拼音的魔法函式
+# ★ 中文轉威妥瑪拼音 (實作統一在 pds_transliteration，這裡保留原有名稱)
 # ==========================================
-def get_wade_giles(text):
-    """將中文姓名轉換為威妥瑪拼音 (大寫)"""
-    if not text: return ""
-    try:
-        from pypinyin import pinyin, Style
-        raw_pinyin = pinyin(text, style=Style.WADEGILES)
-        result = []
-        for item in raw_pinyin:
-            clean_text = ''.join([c for c in item[0] if c.isalpha()]).upper()
-            result.append(clean_text)
-        return " ".join(result)
-    except Exception:
-        return ""
+get_wade_giles = pds_transliteration.to_wade_giles
 
 # ==========================================
 # 3. 新手註冊彈跳視窗 (Onboarding)
@@ -225,6 +180,7 @@ def onboarding_popup():
                         "email": email,
                         "role": "registered"
                     }).eq("line_user_id", st.session_state.line_user_id).execute()
+                    data_access.invalidate_user(st.session_state.line_user_id)
                 except Exception as e:
                     print(f"資料庫更新失敗: {e}")
             
@@ -236,12 +192,61 @@ def onboarding_popup():
 # ==========================================
 # 4. 主程式介面 (戰情室)
 # ==========================================
+# 分頁路由：只執行目前分頁的內容 (st.tabs 每次 rerun 會把六個分頁全部跑一遍)。
+# 目前分頁存在 session_state["active_tab"]，並同步到網址 ?tab=xxx，可直接分享 / 重新整理停在同一頁。
+MEMBER_TABS = {
+    "home": "🏠 首頁",
+    "life_map": "🧬 人生地圖",
+    "divination": "🔮 宇宙指引",
+    "family": "👨‍👩‍👧‍👦 家族矩陣",
+    "journal": "📔 靈魂日記",
+    "member": "👤 會員中心",
+}
+DEFAULT_TAB = "home"
+TABS_NEED_CHARTS = ("life_map", "divination", "family")  # 需要 saved_charts 的分頁
+
+def _sync_tab_param():
+    st.query_params["tab"] = st.session_state.active_tab
+
+def _resolve_active_tab():
+    """網址的 ?tab= 優先 (深層連結)，其次是 session 記住的分頁"""
+    wanted = st.query_params.get("tab")
+    if wanted in MEMBER_TABS:
+        st.session_state.active_tab = wanted
+    elif st.session_state.get("active_tab") not in MEMBER_TABS:
+        st.session_state.active_tab = DEFAULT_TAB
+    if wanted != st.session_state.active_tab:
+        _sync_tab_param()
+
+def _render_tab(tab, friends_raw):
+    if tab == "home":
+        st.subheader(f"歡迎回到能量中心")
+        ads_manager = safe_import("ads_manager")
+        if ads_manager: ads_manager.render_home_ads()
+    elif tab == "life_map":
+        tab_life_map = safe_import("tab_life_map")
+        if tab_life_map: tab_life_map.render(friends_raw)
+    elif tab == "divination":
+        tab_divination = safe_import("tab_divination")
+        if tab_divination: tab_divination.render_divination_view(friends_raw)
+    elif tab == "family":
+        tab_family_matrix = safe_import("tab_family_matrix")
+        if tab_family_matrix: tab_family_matrix.render(friends_raw)
+    elif tab == "journal":
+        tab_journal = safe_import("tab_journal")
+        if tab_journal: tab_journal.render()
+    elif tab == "member":
+        tab_member = safe_import("tab_member")
+        if tab_member: tab_member.render()
+
 def show_member_app():
+    _resolve_active_tab()
+    active_tab = st.session_state.active_tab
+
     friends_raw = []
-    if supabase and "line_user_id" in st.session_state:
+    if active_tab in TABS_NEED_CHARTS and supabase and "line_user_id" in st.session_state:
         try:
-            res = supabase.table("saved_charts").select("*").eq("line_user_id", st.session_state.line_user_id).execute()
-            friends_raw = res.data or []
+            friends_raw = data_access.fetch_saved_charts(st.session_state.line_user_id)
         except Exception as e:
             st.error(f"⚠️ 無法讀取測算檔案：{e}")
 
@@ -266,21 +271,9 @@ def show_member_app():
         st.warning("⚠️ **導航提醒：** 您的個人資料尚未完善，請前往「會員中心」更新出生日期，以獲取精準星盤。")
 
     st.markdown(f"#### Hi, {st.session_state.username} | 九能量導航系統")
-    tabs = st.tabs(["🏠 首頁", "🧬 人生地圖", "🔮 宇宙指引", "👨‍👩‍👧‍👦 家族矩陣", "📔 靈魂日記", "👤 會員中心"])
-    
-    with tabs[0]: 
-        st.subheader(f"歡迎回到能量中心")
-        if ads_manager: ads_manager.render_home_ads()
-    with tabs[1]: 
-        if tab_life_map: tab_life_map.render(friends_raw)
-    with tabs[2]: 
-        if tab_divination: tab_divination.render_divination_view(friends_raw)
-    with tabs[3]: 
-        if tab_family_matrix: tab_family_matrix.render(friends_raw)
-    with tabs[4]: 
-        if tab_journal: tab_journal.render()
-    with tabs[5]: 
-        if tab_member: tab_member.render()
+    st.radio("功能分頁", list(MEMBER_TABS), format_func=MEMBER_TABS.get, key="active_tab",
+             horizontal=True, label_visibility="collapsed", on_change=_sync_tab_param)
+    _render_tab(active_tab, friends_raw)
 
 # ==========================================
 # 5. 程式入口 (狀態與路由控制)
@@ -317,9 +310,9 @@ if __name__ == "__main__":
                     }, on_conflict="line_user_id").execute()
                     
                     # 2. ★ 關鍵救援：把使用者填過的「詳細資料」抓出來！
-                    res = supabase.table("users").select("*").eq("line_user_id", line_id).execute()
-                    if res.data:
-                        fetched_profile = res.data[0]
+                    data_access.invalidate_user(line_id)
+                    fetched_profile = data_access.fetch_user(line_id)
+                    if fetched_profile:
                         
                         # =====================================
                         # 🧹 源頭清洗：拔除 tier 欄位中的討厭引號
@@ -0,0 +1,222 @@
+# benchmarks/bench_pds_core.py
+# pds_core 熱點函式的微基準：以 1900-01-01 ~ 2026-12-31 每一天的生日與威妥瑪拼音姓名語料
+# (data/wade_giles_names.txt，格式同 get_wade_giles 的輸出) 量測 ns/op 與記憶體 (tracemalloc：呼叫後仍留存的
+# bytes / blocks 與峰值)，並與存檔的基準 (baseline_pds_core.json) 比較，讓引擎優化有數字可驗證。
+# 基準取自引擎優化 (查表、批次 API、姓名快取…) 之前的版本：舊版沒有的函式 (例如 calculate_charts) 會自動略過。
+# 語意改過的項目 (CASE_REVISIONS，例如家族動力) 不與舊基準比較，只列出本次數字。
+#
+# 用法 (在專案根目錄)：
+#   python benchmarks/bench_pds_core.py                  # 量測並與基準比較
+#   python benchmarks/bench_pds_core.py --quick          # 生日每 7 天取 1 天，快速檢查
+#   python benchmarks/bench_pds_core.py --save-baseline  # 以本次結果覆寫基準
+#   python benchmarks/bench_pds_core.py --only chart,name --output result.json
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pds_core  # noqa: E402
+
+NAMES_PATH = os.path.join(HERE, "data", "wade_giles_names.txt")
+BASELINE_PATH = os.path.join(HERE, "baseline_pds_core.json")
+FIRST_DATE, LAST_DATE = datetime.date(1900, 1, 1), datetime.date(2026, 12, 31)
+FAMILY_SIZES = (10, 100, 999)
+FAMILY_TARGET_PAIRS = 2_000_000  # 家族動力每輪約處理的 (成員 × 成員) 數，決定呼叫次數
+FAMILY_MIN_OPS = 20              # 大家族至少量 20 次，避免單次量測的雜訊
+TRACE_SAMPLE = 2000  # tracemalloc 會讓程式慢數十倍，記憶體只取前 N 筆輸入量測
+TRACE_SAMPLE_SLOW = 5  # 單次就很慢的項目 (大家族) 記憶體只量前幾次
+# 量測內容 (函式語意) 改過的項目記版本號；與基準版本不同時不比較數字 (沒記的視為第 1 版)
+# calculate_family_dynamics 2：統一引擎，全員兩兩比對並產生 M→O 提示 (舊版只拿第一位成員比其他人)
+CASE_REVISIONS = {"calculate_family_dynamics": 2}
+
+
+def case_revision(name):
+    return CASE_REVISIONS.get(name.split(" (")[0], 1)
+
+
+def load_names(path=NAMES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def all_birthdates(step=1):
+    days = (LAST_DATE - FIRST_DATE).days
+    return [FIRST_DATE + datetime.timedelta(days=i) for i in range(0, days + 1, step)]
+
+
+# --- 量測工具 ---
+def _time_calls(fn, args_list, repeat, setup=None):
+    """回傳最佳一輪的 ns/op (多輪取最小值，排除雜訊)；setup 在每一輪開始前執行 (例如清快取)"""
+    best = None
+    for _ in range(repeat):
+        if setup: setup()
+        gc.collect()
+        t0 = time.perf_counter_ns()
+        for args in args_list:
+            fn(*args)
+        elapsed = time.perf_counter_ns() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(args_list)
+
+
+def _trace_calls(fn, args_list, sample_size=TRACE_SAMPLE):
+    """以 tracemalloc 量測：呼叫後仍留存的 bytes / blocks (平均每次) 與過程中的峰值"""
+    sample = args_list[:sample_size]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        results = [fn(*args) for args in sample]
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    retained = sum(s.size_diff for s in stats if s.size_diff > 0)
+    blocks = sum(s.count_diff for s in stats if s.count_diff > 0)
+    del results
+    return {
+        "retained_bytes_per_op": round(retained / len(sample), 1),
+        "retained_blocks_per_op": round(blocks / len(sample), 2),
+        "peak_kb": round((peak - base) / 1024, 1),
+    }
+
+
+def measure(name, fn, args_list, repeat, setup=None, trace_sample=TRACE_SAMPLE):
+    ns = _time_calls(fn, args_list, repeat, setup)
+    if setup: setup()
+    mem = _trace_calls(fn, args_list, trace_sample)
+    return {"name": name, "revision": case_revision(name), "ops": len(args_list), "ns_per_op": round(ns, 1), **mem}
+
+
+# --- 各項基準 ---
+def _family_groups(birthdates, names):
+    groups = {}
+    for size in FAMILY_SIZES:
+        members = []
+        for i in range(size):
+            bd = birthdates[(i * 37) % len(birthdates)]
+            chart = pds_core.calculate_chart(bd, names[i % len(names)])
+            members.append({"name": names[i % len(names)], "params": chart["svg_params"]})
+        groups[size] = members
+    return groups
+
+
+def build_cases(birthdates, names):
+    """{群組: [(名稱, 函式, 參數列表, setup, 記憶體取樣數)]}；目前版本沒有的函式略過"""
+    pairs = [(bd, names[i % len(names)]) for i, bd in enumerate(birthdates)]
+    ymd = [(bd.year, bd.month, bd.day) for bd in birthdates]
+    engine = pds_core.NineEnergyNumerology()
+    clear_names = getattr(pds_core, "clear_name_cache", None)  # 舊版沒有姓名快取
+    cases = {
+        "chart": [("calculate_chart", pds_core.calculate_chart, pairs, None, TRACE_SAMPLE)],
+        "charts_batch": [],
+        "name": [
+            ("calculate_name_values (cold cache)", pds_core.calculate_name_values,
+             [(n,) for n in names], clear_names, TRACE_SAMPLE),
+            ("calculate_name_values (warm cache)", pds_core.calculate_name_values,
+             [(n,) for n in names], None, TRACE_SAMPLE),
+        ],
+        "triangle": [("calculate_triangle_full", pds_core.calculate_triangle_full, ymd, None, TRACE_SAMPLE)],
+        "diamond": [("NineEnergyNumerology.calculate_diamond_chart", engine.calculate_diamond_chart, ymd, None,
+                     TRACE_SAMPLE)],
+    }
+    if hasattr(pds_core, "calculate_charts"):
+        cases["charts_batch"].append((
+            "calculate_charts (batch of 1000)",
+            lambda bds, ns: pds_core.calculate_charts(bds, ns),
+            [([bd for bd, _ in pairs[i:i + 1000]], [n for _, n in pairs[i:i + 1000]])
+             for i in range(0, len(pairs), 1000)],
+            None, TRACE_SAMPLE,
+        ))
+    family = []
+    for size, members in _family_groups(birthdates, names).items():
+        ops = max(FAMILY_MIN_OPS, FAMILY_TARGET_PAIRS // (size * size))
+        family.append((f"calculate_family_dynamics (N={size})", pds_core.calculate_family_dynamics,
+                       [(members,)] * ops, None, TRACE_SAMPLE if size < 100 else TRACE_SAMPLE_SLOW))
+    cases["family"] = family
+    return cases
+
+
+def run(args):
+    names = load_names()
+    birthdates = all_birthdates(step=7 if args.quick else 1)
+    pds_core.calculate_chart(birthdates[0], names[0])  # 先建好日期查表，不計入量測
+    cases = build_cases(birthdates, names)
+    only = set(args.only.split(",")) if args.only else set(cases)
+    results = []
+    for group, items in cases.items():
+        if group not in only: continue
+        for label, fn, args_list, setup, trace_sample in items:
+            r = measure(label, fn, args_list, args.repeat, setup, trace_sample)
+            results.append(r)
+            print(f"  {label:<50} {r['ns_per_op']:>12,.0f} ns/op  "
+                  f"留存 {r['retained_bytes_per_op']:>9,.0f} B/op  peak {r['peak_kb']:,.0f} KB", flush=True)
+    return {
+        "label": args.label,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "birthdates": len(birthdates),
+        "names": len(names),
+        "results": results,
+    }
+
+
+def compare(result, baseline):
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    print(f"\n與基準比較 (ratio < 1 表示變快)：{baseline.get('label') or ''}")
+    if baseline.get("quick") != result["quick"]:
+        print("  ⚠️ 基準與本次的 --quick 設定不同，輸入資料量不一致，僅供參考")
+    for r in result["results"]:
+        b = base.get(r["name"])
+        if not b: continue
+        if b.get("revision", 1) != r.get("revision", 1):
+            print(f"  {r['name']:<50} 量測內容已變更 (基準第 {b.get('revision', 1)} 版 → 第 {r.get('revision', 1)} 版)，不比較")
+            continue
+        ratio = r["ns_per_op"] / b["ns_per_op"] if b["ns_per_op"] else float("nan")
+        print(f"  {r['name']:<50} {b['ns_per_op']:>12,.0f} → {r['ns_per_op']:>12,.0f} ns/op  x{ratio:.2f}")
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="pds_core 微基準")
+    p.add_argument("--quick", action="store_true", help="生日每 7 天取 1 天")
+    p.add_argument("--repeat", type=int, default=3, help="每項量測的輪數 (取最佳)")
+    p.add_argument("--only", help="只跑指定群組：chart,charts_batch,name,triangle,diamond,family")
+    p.add_argument("--output", help="另存本次結果 JSON")
+    p.add_argument("--baseline", default=BASELINE_PATH, help="基準 JSON 路徑")
+    p.add_argument("--save-baseline", action="store_true", help="以本次結果覆寫基準")
+    p.add_argument("--label", help="記在結果中的說明 (例如量測的是哪個版本)")
+    args = p.parse_args(argv)
+
+    result = run(args)
+    if args.output:
+        _write_json(args.output, result)
+    if args.save_baseline:
+        _write_json(args.baseline, result)
+        print(f"\n已寫入基準 {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
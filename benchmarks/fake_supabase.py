@@ -0,0 +1,115 @@
+# benchmarks/fake_supabase.py
+# 壓測 / 本機測試用的 Supabase 替身：資料放在記憶體，支援 payment_orders / payment_queue 用到的
+# table().select / insert / upsert / update / eq / in_ / lt / execute，可注入延遲與隨機失敗。
+# 用法：payment_orders.set_client(FakeSupabase(latency=0.02, fail_rate=0.05))
+
+import datetime
+import random
+import threading
+import time
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self._db, self._table = db, table
+        self._op, self._row, self._filters = "select", None, []
+        self._on_conflict, self._ignore_duplicates = None, False
+
+    def select(self, *_columns):
+        self._op = "select"
+        return self
+
+    def insert(self, row):
+        self._op, self._row = "insert", row
+        return self
+
+    def upsert(self, row, on_conflict=None, ignore_duplicates=False):
+        self._op, self._row = "upsert", row
+        self._on_conflict, self._ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, row):
+        self._op, self._row = "update", row
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self._filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda r: r.get(column) is not None and r.get(column) < value)
+        return self
+
+    def execute(self):
+        return self._db._execute(self)
+
+
+class FakeSupabase:
+    """
+    latency:    每次 execute 的模擬網路延遲 (秒)
+    fail_rate:  users 表寫入隨機失敗的機率 (模擬 Supabase 暫時故障，用來驗證重試)
+    """
+
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.tables = {}
+        self.calls = 0
+        self.failures = 0
+        self.user_updates = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def _execute(self, q):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            rows = self.tables.setdefault(q._table, [])
+            if q._table == "users" and q._op != "select" and self._rng.random() < self.fail_rate:
+                self.failures += 1
+                raise FakeAPIError("injected failure")
+
+            if q._op == "select":
+                return _Result([dict(r) for r in rows if all(f(r) for f in q._filters)])
+
+            if q._op in ("insert", "upsert"):
+                key = q._on_conflict
+                existing = [r for r in rows if key and r.get(key) == q._row.get(key)]
+                if existing:
+                    if q._op == "insert" or q._ignore_duplicates:
+                        if q._op == "insert":
+                            raise FakeAPIError("duplicate key value violates unique constraint")
+                        return _Result([])
+                    existing[0].update(q._row)
+                    return _Result([dict(existing[0])])
+                row = dict(q._row)
+                row.setdefault("updated_at", datetime.datetime.now(datetime.timezone.utc).isoformat())  # 同資料庫 default now()
+                rows.append(row)
+                return _Result([dict(row)])
+
+            matched = []
+            for r in rows:
+                if all(f(r) for f in q._filters):
+                    r.update(q._row)
+                    matched.append(dict(r))
+            if q._table == "users":
+                self.user_updates += 1
+            return _Result(matched)
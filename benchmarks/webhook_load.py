@@ -0,0 +1,200 @@
+# benchmarks/webhook_load.py
+# 金流 webhook 壓測：以 uvicorn 啟動 payment_api.app (資料庫換成記憶體替身)，
+# 同時送出大量表單格式的 APN 通知 (夾雜重送與錯誤請求)，統計延遲百分位、吞吐量與錯誤率，
+# 結果寫成 JSON 方便逐次比較。
+#
+# 用法 (在專案根目錄)：
+#   python benchmarks/webhook_load.py --requests 5000 --concurrency 100 --output benchmarks/results/bench_webhook.json
+#   python benchmarks/webhook_load.py --duplicate-rate 0.5 --db-fail-rate 0.1 --db-latency 0.02
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values: return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def build_payloads(n, duplicate_rate, bad_rate, rng):
+    """產生 n 筆通知：部分重送既有訂單，部分是缺少 OrderNo 的錯誤請求"""
+    payloads, issued = [], []
+    for i in range(n):
+        r = rng.random()
+        if r < bad_rate:
+            payloads.append(("bad", {"Status": "S"}))
+        elif issued and r < bad_rate + duplicate_rate:
+            payloads.append(("duplicate", rng.choice(issued)))
+        else:
+            form = {"OrderNo": f"BENCH{i:07d}", "Status": "S", "CustomField1": f"U{i % 500:04d}"}
+            issued.append(form)
+            payloads.append(("new", form))
+    return payloads
+
+
+def _start_server(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline: raise RuntimeError("uvicorn 未能啟動")
+        time.sleep(0.02)
+    return server, thread
+
+
+async def _fire(url, payloads, concurrency):
+    import httpx
+    sem = asyncio.Semaphore(concurrency)
+    latencies, outcomes = [], {"ok": 0, "rejected": 0, "error": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def one(kind, form):
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    res = await client.post(url, data=form)
+                    text = res.text
+                except Exception:
+                    outcomes["error"] += 1
+                    return
+                latencies.append(time.perf_counter() - t0)
+                if res.status_code == 200 and text == "1|OK":
+                    outcomes["ok"] += 1
+                elif kind == "bad" and res.status_code == 400:
+                    outcomes["rejected"] += 1
+                else:
+                    outcomes["error"] += 1
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(one(kind, form) for kind, form in payloads))
+        elapsed = time.perf_counter() - t_start
+    return latencies, outcomes, elapsed
+
+
+def _wait_drained(payment_queue, timeout):
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        stats = payment_queue.stats()
+        if not stats.get("pending") and not stats.get("running"):
+            return time.time() - t0, stats
+        time.sleep(0.05)
+    return None, payment_queue.stats()
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    tmpdir = tempfile.mkdtemp(prefix="webhook_load_")
+    os.environ["PAYMENT_QUEUE_DB"] = os.path.join(tmpdir, "queue.db")
+
+    import payment_api
+    import payment_orders
+    import payment_queue
+    from fake_supabase import FakeSupabase
+
+    payment_queue.DB_PATH = os.environ["PAYMENT_QUEUE_DB"]
+    payment_queue.BACKOFF_BASE = args.backoff_base
+    fake = FakeSupabase(latency=args.db_latency, fail_rate=args.db_fail_rate, seed=args.seed)
+    payment_orders.set_client(fake)
+
+    payloads = build_payloads(args.requests, args.duplicate_rate, args.bad_rate, rng)
+    unique_orders = len({f["OrderNo"] for kind, f in payloads if kind == "new"})
+
+    port = _free_port()
+    quiet = contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext()
+    with quiet:
+        server, thread = _start_server(payment_api.app, port)
+        try:
+            latencies, outcomes, elapsed = asyncio.run(
+                _fire(f"http://127.0.0.1:{port}/webhook/ccat", payloads, args.concurrency))
+            drain_s, queue_stats = _wait_drained(payment_queue, args.drain_timeout)
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    latencies.sort()
+    ms = lambda v: None if v is None else round(v * 1000, 3)
+    applied = sum(1 for r in fake.tables.get("payment_orders", []) if r.get("status") == "applied")
+    total = len(payloads)
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "requests": total,
+        "unique_orders": unique_orders,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1] if latencies else None),
+            "mean": ms(sum(latencies) / len(latencies) if latencies else None),
+        },
+        "responses": outcomes,
+        "error_rate": round(outcomes["error"] / total, 6) if total else 0.0,
+        "queue": {"drain_s": None if drain_s is None else round(drain_s, 3), "stats": queue_stats},
+        "ledger": {
+            "applied_orders": applied,
+            "user_updates": fake.user_updates,
+            "duplicate_upgrades": max(fake.user_updates - applied, 0),
+            "injected_db_failures": fake.failures,
+        },
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="payment_api webhook 壓測")
+    p.add_argument("--requests", type=int, default=2000, help="總請求數")
+    p.add_argument("--concurrency", type=int, default=50, help="同時在途的請求數")
+    p.add_argument("--duplicate-rate", type=float, default=0.3, help="重送既有訂單的比例")
+    p.add_argument("--bad-rate", type=float, default=0.02, help="缺少 OrderNo 的錯誤請求比例")
+    p.add_argument("--db-latency", type=float, default=0.01, help="替身資料庫每次呼叫的延遲 (秒)")
+    p.add_argument("--db-fail-rate", type=float, default=0.05, help="升級寫入隨機失敗的機率")
+    p.add_argument("--backoff-base", type=float, default=0.05, help="佇列重試的退避基數 (秒，壓測時縮短)")
+    p.add_argument("--drain-timeout", type=float, default=60, help="等待佇列清空的上限 (秒)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "bench_webhook.json"),
+                   help="結果 JSON 路徑 (預設 benchmarks/results/，不進版控)")
+    p.add_argument("--verbose", action="store_true", help="顯示 webhook 的逐筆 log")
+    args = p.parse_args(argv)
+
+    result = run(args)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    lat = result["latency_ms"]
+    print(f"{result['requests']} 筆 / {result['elapsed_s']}s = {result['throughput_rps']} req/s  "
+          f"p50 {lat['p50']}ms  p95 {lat['p95']}ms  p99 {lat['p99']}ms  錯誤率 {result['error_rate']:.2%}")
+    print(f"佇列清空 {result['queue']['drain_s']}s {result['queue']['stats']}  "
+          f"重複升級 {result['ledger']['duplicate_upgrades']}  → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
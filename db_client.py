@@ -0,0 +1,74 @@
+# db_client.py
+# 喬鈞心學 PDS - Supabase 連線工廠
+# 全站共用同一條 httpx 連線池 (keep-alive)，避免每個模組各自握手 TLS；
+# 逾時與連線數可用環境變數調整：
+#   SUPABASE_TIMEOUT          單次請求逾時秒數 (預設 10)
+#   SUPABASE_CONNECT_TIMEOUT  建立連線逾時秒數 (預設 5)
+#   SUPABASE_POOL_SIZE        連線池上限 (預設 20)
+#   SUPABASE_KEEPALIVE        閒置連線保留秒數 (預設 60)
+
+import os
+import threading
+
+import httpx
+from supabase import create_client, ClientOptions
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+DEFAULT_TIMEOUT = _env_float("SUPABASE_TIMEOUT", 10)
+DEFAULT_CONNECT_TIMEOUT = _env_float("SUPABASE_CONNECT_TIMEOUT", 5)
+DEFAULT_POOL_SIZE = int(_env_float("SUPABASE_POOL_SIZE", 20))
+DEFAULT_KEEPALIVE = _env_float("SUPABASE_KEEPALIVE", 60)
+
+_lock = threading.Lock()
+_http_client = None
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401 (httpx 的 http2 需要 h2 套件)
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client():
+    """整個行程共用的 httpx.Client (連線池 + keep-alive)，第一次呼叫時建立"""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=DEFAULT_POOL_SIZE,
+                        max_keepalive_connections=DEFAULT_POOL_SIZE,
+                        keepalive_expiry=DEFAULT_KEEPALIVE,
+                    ),
+                    follow_redirects=True,
+                    http2=_http2_available(),
+                )
+    return _http_client
+
+
+def create_pooled_client(url, key, persist_session=True):
+    """
+    建立走共用連線池的 Supabase client。
+    舊版 supabase-py 不支援 httpx_client 參數時，退回只設定逾時。
+    """
+    timeout_options = {
+        "postgrest_client_timeout": DEFAULT_TIMEOUT,
+        "storage_client_timeout": int(DEFAULT_TIMEOUT),
+        "function_client_timeout": int(DEFAULT_TIMEOUT),
+    }
+    try:
+        options = ClientOptions(httpx_client=get_http_client(), persist_session=persist_session, **timeout_options)
+    except TypeError:
+        options = ClientOptions(persist_session=persist_session, **timeout_options)
+    return create_client(url, key, options=options)
@@ -1,16 +1,39 @@
+import asyncio
 import os
-from fastapi import FastAPI, Request, Form
+
+from fastapi import FastAPI, Request, BackgroundTasks, Header, HTTPException
 from fastapi.responses import PlainTextResponse
-from supabase import create_client, Client
+
+import payment_orders
+import payment_queue
 
 # 初始化 FastAPI 秘書
 app = FastAPI(title="九能量金流接單秘書")
 
-# 連線到您的 Supabase 資料庫
-# (這裡會自動抓取您在 Zeabur 上設定的環境變數)
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# 資料庫連線由 payment_orders 管理 (讀取 Zeabur 上設定的 SUPABASE_URL / SUPABASE_KEY，
+# 第一次用到時才建立，走 db_client 連線池；壓測時可用 payment_orders.set_client 換成替身)
+# 升級工作先寫進本機佇列 (payment_queue)，由背景 worker 寫入 Supabase 並自動重試
+
+# 管理端點 (死信查詢 / 重送) 的存取金鑰；未設定時管理端點一律拒絕
+ADMIN_TOKEN = os.environ.get("PAYMENT_ADMIN_TOKEN")
+
+
+@app.on_event("startup")
+async def _start_queue_workers():
+    await payment_queue.start_workers()
+
+
+@app.on_event("shutdown")
+async def _stop_queue_workers():
+    await payment_queue.stop_workers()
+
+
+def _record_ignored(order_no, target_user_id, status, data_dict):
+    try:
+        payment_orders.record_ignored(order_no, target_user_id, status, data_dict)
+    except Exception as e:
+        print(f"❌ 訂單 {order_no} 記帳失敗: {e}")
+
 
 @app.get("/")
 def read_root():
@@ -20,9 +43,11 @@ def read_root():
 # ★ 核心任務：接收客樂得的 APN 主動通知
 # ==========================================
 @app.post("/webhook/ccat")
-async def receive_payment_notification(request: Request):
+async def receive_payment_notification(request: Request, background_tasks: BackgroundTasks):
     """
     接收統一客樂得付款成功後的背景通知 (Webhook/APN)
+    只做驗證、去重並寫入本機佇列就回覆 1|OK；Supabase 寫入由佇列 worker 處理 (失敗自動退避重試)，
+    重送的同一 OrderNo 不會重複升級。
     """
     try:
         # 1. 取得客樂得傳來的表單資料 (通常包含訂單編號、金額、交易狀態等)
@@ -42,18 +67,27 @@ async def receive_payment_notification(request: Request):
         # if not verify_mac_value(data_dict):
         #     return PlainTextResponse("0|Error", status_code=400)
 
-        # 3. 如果付款成功 (假設客樂得的成功代碼是 'S' 或 '1')
-        if status == "S" or status == "1" or status == "SUCCESS":
-            
-            # 從訂單編號中，反查出這是哪個用戶買的 (這需要我們之後在資料庫建一個訂單表)
-            # 這裡我們先示範「直接透過 line_user_id 或 username 升級」的邏輯
-            # 假設我們將用戶的 line_user_id 藏在訂單編號的自訂欄位裡
-            target_user_id = data_dict.get("CustomField1", "") 
-            
-            if target_user_id:
-                # 🚀 執行資料庫升級動作！將用戶的 tier 改為 'pro'
-                supabase.table("users").update({"tier": "pro"}).eq("line_user_id", target_user_id).execute()
-                print(f"✅ 已成功將用戶 {target_user_id} 升級為專業會員！")
+        if not order_no:
+            return PlainTextResponse("0|Error", status_code=400)
+
+        # 從訂單編號中，反查出這是哪個用戶買的
+        # 假設我們將用戶的 line_user_id 藏在訂單編號的自訂欄位裡
+        target_user_id = data_dict.get("CustomField1", "")
+
+        # 3. 同一行程內已收過的訂單 (金流商重送) 直接回覆，不再排工作
+        if not payment_orders.claim_recent(order_no):
+            return PlainTextResponse("1|OK")
+
+        if payment_orders.is_success(status) and target_user_id:
+            # 🚀 升級動作 (將用戶的 tier 改為 'pro') 排入佇列；寫入佇列失敗才回報錯誤讓金流商重送
+            try:
+                await payment_queue.enqueue_async(order_no, target_user_id, data_dict)
+            except Exception:
+                payment_orders.release_recent(order_no)
+                raise
+        else:
+            payment_orders.release_recent(order_no)
+            background_tasks.add_task(_record_ignored, order_no, target_user_id, status, data_dict)
 
         # 4. 回報給客樂得主機：「我收到了，處理完畢！」
         # (通常金流公司要求回傳特定的字串，例如 "1|OK" 或 "SUCCESS")
@@ -61,4 +95,33 @@ async def receive_payment_notification(request: Request):
 
     except Exception as e:
         print(f"❌ 金流處理發生錯誤: {e}")
-        return PlainTextResponse("0|Error", status_code=500)
\ No newline at end of file
+        return PlainTextResponse("0|Error", status_code=500)
+
+
+# ==========================================
+# 管理：升級佇列狀態與死信
+# ==========================================
+def _check_admin(token):
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+@app.get("/admin/payment-queue")
+async def payment_queue_stats(x_admin_token: str = Header(None)):
+    _check_admin(x_admin_token)
+    return await asyncio.to_thread(payment_queue.stats)
+
+
+@app.get("/admin/payment-queue/dead")
+async def payment_queue_dead_letters(limit: int = 100, x_admin_token: str = Header(None)):
+    """重試多次仍失敗的升級工作 (需人工確認)"""
+    _check_admin(x_admin_token)
+    return await asyncio.to_thread(payment_queue.dead_letters, limit)
+
+
+@app.post("/admin/payment-queue/dead/{job_id}/retry")
+async def payment_queue_retry(job_id: int, x_admin_token: str = Header(None)):
+    _check_admin(x_admin_token)
+    if not await asyncio.to_thread(payment_queue.retry_dead, job_id):
+        raise HTTPException(status_code=404, detail="job not found")
+    return {"status": "requeued", "id": job_id}
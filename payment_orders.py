@@ -0,0 +1,180 @@
+# payment_orders.py
+# 喬鈞心學 PDS - 金流訂單帳本
+# 每筆客樂得通知先以 OrderNo 登記到 payment_orders，同一訂單只會升級一次；
+# 金流商重送 (retry) 的通知會在行程內或資料庫層被擋下。
+#
+# Supabase 建表 (一次性)：
+#   create table payment_orders (
+#       order_no     text primary key,
+#       line_user_id text,
+#       status       text not null default 'received',  -- received / processing / applied / failed / ignored
+#       tier         text,
+#       payload      jsonb,
+#       error        text,
+#       created_at   timestamptz default now(),
+#       updated_at   timestamptz default now()
+#   );
+
+import collections
+import datetime
+import os
+import threading
+
+import db_client
+
+ORDERS_TABLE = "payment_orders"
+SUCCESS_STATUSES = ("S", "1", "SUCCESS")
+UPGRADE_TIER = "pro"
+PROCESSING_STALE_SECONDS = 300  # 停在 processing 超過此秒數視為中斷 (例如行程被重啟)，可重新搶占
+RECENT_ORDERS_LIMIT = 10000  # 行程內記住最近處理過的訂單數 (擋連續重送，不必每次查庫)
+
+_client = None
+_client_lock = threading.Lock()
+
+_recent = collections.OrderedDict()  # order_no -> "processing" / "applied"
+_recent_lock = threading.Lock()
+
+
+# --- 資料庫 client ---
+def get_client():
+    """預設走 db_client 連線池；測試或壓測可先以 set_client 換成本地替身"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                url = os.environ.get("SUPABASE_URL")
+                key = os.environ.get("SUPABASE_KEY")
+                if not (url and key):
+                    raise RuntimeError("缺少 SUPABASE_URL / SUPABASE_KEY 環境變數")
+                _client = db_client.create_pooled_client(url, key, persist_session=False)
+    return _client
+
+
+def set_client(client):
+    """替換資料庫 client (需提供 supabase-py 相同的 table(...).xxx().execute() 介面)"""
+    global _client
+    with _client_lock:
+        _client = client
+    clear_recent()
+
+
+# --- 行程內去重 ---
+def _remember(order_no, state):
+    with _recent_lock:
+        _recent[order_no] = state
+        _recent.move_to_end(order_no)
+        while len(_recent) > RECENT_ORDERS_LIMIT:
+            _recent.popitem(last=False)
+
+
+def _forget(order_no):
+    with _recent_lock:
+        _recent.pop(order_no, None)
+
+
+def claim_recent(order_no):
+    """行程內搶占訂單：第一次呼叫回傳 True，之後的重送回傳 False"""
+    with _recent_lock:
+        if order_no in _recent:
+            return False
+        _recent[order_no] = "processing"
+        while len(_recent) > RECENT_ORDERS_LIMIT:
+            _recent.popitem(last=False)
+        return True
+
+
+def release_recent(order_no):
+    """放掉行程內的搶占 (例如非成功狀態的通知，之後同一訂單的成功通知仍要處理)"""
+    _forget(order_no)
+
+
+def clear_recent():
+    with _recent_lock:
+        _recent.clear()
+
+
+# --- 帳本 ---
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def is_success(status):
+    return str(status) in SUCCESS_STATUSES
+
+
+def _claim_in_ledger(client, order_no, line_user_id, payload):
+    """
+    在資料庫登記訂單並取得處理權，回傳：
+    "claimed" (新訂單、先前失敗或處理中斷的訂單) / "applied" (已升級過) / "in_progress" (別的工作正在處理)。
+    """
+    res = client.table(ORDERS_TABLE).upsert({
+        "order_no": order_no,
+        "line_user_id": line_user_id,
+        "status": "processing",
+        "tier": UPGRADE_TIER,
+        "payload": payload,
+    }, on_conflict="order_no", ignore_duplicates=True).execute()
+    if res.data:
+        return "claimed"
+    # 訂單已存在：只有上次失敗 (或先前非成功狀態) 的才重新搶占；條件更新，避免兩個工作同時接手
+    claim = {
+        "line_user_id": line_user_id, "status": "processing", "tier": UPGRADE_TIER,
+        "payload": payload, "error": None, "updated_at": _now(),
+    }
+    res = client.table(ORDERS_TABLE).update(claim)\
+        .eq("order_no", order_no).in_("status", ["failed", "ignored"]).execute()
+    if res.data:
+        return "claimed"
+    # 停在 processing 太久的 (上次處理到一半行程就中斷) 也可接手
+    stale_before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=PROCESSING_STALE_SECONDS)
+    res = client.table(ORDERS_TABLE).update(claim)\
+        .eq("order_no", order_no).eq("status", "processing").lt("updated_at", stale_before.isoformat()).execute()
+    if res.data:
+        return "claimed"
+    # 搶不到：確認是真的升級過，還是仍在處理中 (例如重啟前搶占、尚未逾時)
+    res = client.table(ORDERS_TABLE).select("status").eq("order_no", order_no).execute()
+    return "applied" if res.data and res.data[0].get("status") == "applied" else "in_progress"
+
+
+def _set_status(client, order_no, status, error=None):
+    client.table(ORDERS_TABLE).update({"status": status, "error": error, "updated_at": _now()})\
+        .eq("order_no", order_no).execute()
+
+
+def apply_order(order_no, line_user_id, payload=None):
+    """
+    依帳本處理一筆付款成功的訂單 (同步函式，請在執行緒池中呼叫，勿阻塞 event loop)。
+    回傳 "applied" / "duplicate" (先前已升級) / "in_progress" (帳本中仍在處理、尚未逾時，稍後再試)；
+    資料庫錯誤時標記 failed 後重新拋出。
+    """
+    client = get_client()
+    claim = _claim_in_ledger(client, order_no, line_user_id, payload or {})
+    if claim == "in_progress":
+        return "in_progress"
+    if claim == "applied":
+        _remember(order_no, "applied")
+        return "duplicate"
+    try:
+        client.table("users").update({"tier": UPGRADE_TIER}).eq("line_user_id", line_user_id).execute()
+        _set_status(client, order_no, "applied")
+    except Exception as e:
+        _forget(order_no)
+        try:
+            _set_status(client, order_no, "failed", error=str(e)[:500])
+        except Exception:
+            pass
+        raise
+    _remember(order_no, "applied")
+    return "applied"
+
+
+def record_ignored(order_no, line_user_id, status, payload=None):
+    """非成功狀態的通知只記帳，不升級 (重送時同樣被 OrderNo 擋下)"""
+    client = get_client()
+    client.table(ORDERS_TABLE).upsert({
+        "order_no": order_no,
+        "line_user_id": line_user_id,
+        "status": "ignored",
+        "payload": payload or {},
+        "error": f"status={status}",
+    }, on_conflict="order_no", ignore_duplicates=True).execute()
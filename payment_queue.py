@@ -0,0 +1,228 @@
+# payment_queue.py
+# 喬鈞心學 PDS - 會員升級工作佇列 (SQLite)
+# Webhook 只把升級工作寫進本機佇列就回覆金流商；背景 worker 再把 tier 寫進 Supabase，
+# 失敗時以指數退避重試，超過次數轉入 dead (死信)，可從管理端點查看並手動重送。
+# 可調整的環境變數：
+#   PAYMENT_QUEUE_DB            佇列檔案路徑 (預設 databases/payment_queue.db)
+#   PAYMENT_QUEUE_WORKERS       worker 數 (預設 2)
+#   PAYMENT_QUEUE_MAX_ATTEMPTS  最多嘗試次數，超過即轉入死信 (預設 8)
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import payment_orders
+
+DB_PATH = os.environ.get(
+    "PAYMENT_QUEUE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "databases", "payment_queue.db"))
+WORKER_COUNT = int(os.environ.get("PAYMENT_QUEUE_WORKERS", 2))
+MAX_ATTEMPTS = int(os.environ.get("PAYMENT_QUEUE_MAX_ATTEMPTS", 8))
+BACKOFF_BASE = 2.0     # 第 n 次失敗後等待 BACKOFF_BASE * 2^(n-1) 秒
+BACKOFF_MAX = 600.0    # 單次等待上限 (秒)
+POLL_INTERVAL = 1.0    # 佇列空時 worker 的最長等待 (秒)
+IN_PROGRESS_RETRY = 30.0  # 帳本顯示訂單仍在處理中時，隔多久再檢查 (不計入嘗試次數)
+ERROR_PAUSE = 5.0      # worker 本身出錯 (例如 SQLite 被鎖) 後的暫停秒數
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upgrade_jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_no     TEXT NOT NULL UNIQUE,
+    line_user_id TEXT NOT NULL,
+    payload      TEXT,
+    status       TEXT NOT NULL DEFAULT 'pending',   -- pending / running / done / dead
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_run_at  REAL NOT NULL,
+    last_error   TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_upgrade_jobs_due ON upgrade_jobs (status, next_run_at);
+"""
+
+_conn = None
+_conn_path = None
+_lock = threading.Lock()
+
+
+def _connect():
+    global _conn, _conn_path
+    if _conn is None or _conn_path != DB_PATH:
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _conn, _conn_path = conn, DB_PATH
+    return _conn
+
+
+def _execute(sql, params=()):
+    with _lock:
+        return _connect().execute(sql, params)
+
+
+# --- 佇列操作 (同步，皆為本機 SQLite，毫秒等級) ---
+def enqueue(order_no, line_user_id, payload=None):
+    """登記一筆升級工作；同一 OrderNo 只會有一筆 (重送時回傳 False)"""
+    now = time.time()
+    cur = _execute(
+        "INSERT OR IGNORE INTO upgrade_jobs (order_no, line_user_id, payload, next_run_at, created_at, updated_at)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        (order_no, line_user_id, json.dumps(payload or {}, ensure_ascii=False), now, now, now),
+    )
+    return cur.rowcount == 1
+
+
+def claim_next():
+    """取出一筆到期的工作並標記為 running；沒有到期工作時回傳 None"""
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM upgrade_jobs WHERE status = 'pending' AND next_run_at <= ?"
+                " ORDER BY next_run_at LIMIT 1", (now,)).fetchone()
+            if row:
+                conn.execute("UPDATE upgrade_jobs SET status = 'running', attempts = attempts + 1, updated_at = ?"
+                             " WHERE id = ?", (now, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    if not row:
+        return None
+    job = dict(row)
+    job["attempts"] += 1
+    job["payload"] = json.loads(job["payload"] or "{}")
+    return job
+
+
+def backoff_delay(attempts):
+    """第 attempts 次失敗後的等待秒數 (指數退避 + 10% 抖動，避免同時重試)"""
+    delay = min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def complete(job_id):
+    _execute("UPDATE upgrade_jobs SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ?",
+             (time.time(), job_id))
+
+
+def fail(job):
+    """記錄失敗：未達上限則排定下次重試，否則轉入死信"""
+    now = time.time()
+    error = str(job.get("error") or "")[:500]
+    if job["attempts"] >= MAX_ATTEMPTS:
+        _execute("UPDATE upgrade_jobs SET status = 'dead', last_error = ?, updated_at = ? WHERE id = ?",
+                 (error, now, job["id"]))
+    else:
+        _execute("UPDATE upgrade_jobs SET status = 'pending', next_run_at = ?, last_error = ?, updated_at = ?"
+                 " WHERE id = ?", (now + backoff_delay(job["attempts"]), error, now, job["id"]))
+
+
+def defer(job, delay=IN_PROGRESS_RETRY, reason=None):
+    """延後重試但不計入嘗試次數 (例如訂單在帳本中仍由別的工作處理中)"""
+    now = time.time()
+    _execute("UPDATE upgrade_jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), next_run_at = ?,"
+             " last_error = ?, updated_at = ? WHERE id = ?",
+             (now + delay * random.uniform(0.9, 1.1), reason, now, job["id"]))
+
+
+def recover_running():
+    """行程重啟時，把上次中斷在 running 的工作放回佇列"""
+    cur = _execute("UPDATE upgrade_jobs SET status = 'pending', next_run_at = ? WHERE status = 'running'",
+                   (time.time(),))
+    return cur.rowcount
+
+
+def dead_letters(limit=100):
+    """列出死信 (重試多次仍失敗的升級)，新的在前"""
+    rows = _execute("SELECT id, order_no, line_user_id, attempts, last_error, created_at, updated_at"
+                    " FROM upgrade_jobs WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?", (limit,))
+    return [dict(r) for r in rows.fetchall()]
+
+
+def retry_dead(job_id):
+    """把一筆死信放回佇列 (重新計算嘗試次數)；找不到回傳 False"""
+    cur = _execute("UPDATE upgrade_jobs SET status = 'pending', attempts = 0, next_run_at = ?, updated_at = ?"
+                   " WHERE id = ? AND status = 'dead'", (time.time(), time.time(), job_id))
+    return cur.rowcount == 1
+
+
+def stats():
+    rows = _execute("SELECT status, COUNT(*) AS n FROM upgrade_jobs GROUP BY status").fetchall()
+    return {r["status"]: r["n"] for r in rows}
+
+
+# --- 背景 worker (asyncio；同步的 SQLite / Supabase 呼叫一律丟到執行緒) ---
+_wakeup = None
+_tasks = []
+
+
+def _process(job):
+    try:
+        result = payment_orders.apply_order(job["order_no"], job["line_user_id"], job["payload"])
+    except Exception as e:
+        job["error"] = e
+        fail(job)
+        print(f"❌ 訂單 {job['order_no']} 升級失敗 (第 {job['attempts']} 次): {e}")
+        return
+    if result == "in_progress":
+        # 帳本顯示仍在處理中 (例如重啟前已搶占)：不能當作完成，等逾時可接手後再試
+        defer(job, reason="訂單仍在處理中")
+        return
+    complete(job["id"])
+    if result == "applied":
+        print(f"✅ 已成功將用戶 {job['line_user_id']} 升級為專業會員！(訂單 {job['order_no']})")
+
+
+async def _worker():
+    while True:
+        try:
+            job = await asyncio.to_thread(claim_next)
+            if job is None:
+                _wakeup.clear()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await asyncio.to_thread(_process, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 佇列本身出錯 (例如 database is locked) 不可讓 worker 結束；running 中的工作重啟時會被放回
+            print(f"❌ 升級佇列 worker 發生錯誤，{ERROR_PAUSE:.0f} 秒後繼續: {e}")
+            await asyncio.sleep(ERROR_PAUSE)
+
+
+async def enqueue_async(order_no, line_user_id, payload=None):
+    """在 event loop 中登記工作並喚醒 worker"""
+    added = await asyncio.to_thread(enqueue, order_no, line_user_id, payload)
+    if added and _wakeup is not None:
+        _wakeup.set()
+    return added
+
+
+async def start_workers(count=None):
+    """啟動 worker (於 FastAPI startup 呼叫)"""
+    global _wakeup
+    if _tasks: return
+    _wakeup = asyncio.Event()
+    await asyncio.to_thread(recover_running)
+    for _ in range(count or WORKER_COUNT):
+        _tasks.append(asyncio.create_task(_worker()))
+
+
+async def stop_workers():
+    """停止 worker (於 FastAPI shutdown 呼叫)；執行中的工作下次啟動會被 recover_running 放回佇列"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -4,76 +4,93 @@
 # 曼格拉/九能量運算引擎 (NineEnergyNumerology)
 
 import datetime
+import functools
+import itertools
+import re
 import unicodedata
 
+import numpy as np
+
+import pds_date_table
+import pds_reduction
+
 # ==========================================
 # 1. 基礎數學工具
 # ==========================================
-def get_digit_sum(n):
-    return sum(int(d) for d in str(n))
-
-def get_single_digit(n):
-    while n > 9: n = get_digit_sum(n)
-    return n
-
-def format_tradition(n):
-    path = [str(n)]; curr = n
-    while curr > 9: curr = get_digit_sum(curr); path.append(str(curr))
-    if len(path) == 1: return path[0]
-    return f"{''.join(path[:-1])}/{path[-1]}"
+# 實作集中在 pds_reduction (mod 9 公式 + 化約路徑快取)，這裡保留原有名稱
+get_digit_sum = pds_reduction.digit_sum
+get_single_digit = pds_reduction.single_digit
+format_tradition = pds_reduction.format_tradition
 
 # ==========================================
 # 2. 姓名學邏輯 (包含性情統計)
 # ==========================================
-def calculate_name_values(name):
-    if not name: 
-        return {
-            "soul_str": "0", "soul_val": 0, "persona_str": "0", "persona_val": 0, 
-            "destiny_str": "0", "destiny_val": 0, "temperament_string": "0-0-0-0"
-        }
-    
-    name_clean = "".join(filter(str.isalpha, name.upper()))
-    table = {
-        'A':1,'J':1,'S':1,
-        'B':2,'K':2,'T':2,
-        'C':3,'L':3,'U':3,
-        'D':4,'M':4,'V':4,
-        'E':5,'N':5,'W':5,
-        'F':6,'O':6,'X':6,
-        'G':7,'P':7,'Y':7,
-        'H':8,'Q':8,'Z':8,
-        'I':9,'R':9
-    }
-    
-    temp_counts = {"body": 0, "mental": 0, "emotional": 0, "intuitive": 0}
-    vowels_set = {'A','E','I','O','U'}
-    sum_soul = 0; sum_persona = 0
-
-    for char in name_clean:
-        if char in table:
-            val = table[char]
-            if char in vowels_set: sum_soul += val
-            else: sum_persona += val
-            
-            # 性情分類
-            if val in [4, 5]: temp_counts["body"] += 1
-            elif val in [1, 8]: temp_counts["mental"] += 1
-            elif val in [2, 3, 6]: temp_counts["emotional"] += 1
-            elif val in [7, 9]: temp_counts["intuitive"] += 1
-
-    sum_destiny = sum_soul + sum_persona
-    temp_str = f"{temp_counts['body']}-{temp_counts['mental']}-{temp_counts['emotional']}-{temp_counts['intuitive']}"
+# 字母對照表 (畢達哥拉斯) 與母音：模組載入時建好一次
+LETTER_VALUES = {
+    'A':1,'J':1,'S':1,
+    'B':2,'K':2,'T':2,
+    'C':3,'L':3,'U':3,
+    'D':4,'M':4,'V':4,
+    'E':5,'N':5,'W':5,
+    'F':6,'O':6,'X':6,
+    'G':7,'P':7,'Y':7,
+    'H':8,'Q':8,'Z':8,
+    'I':9,'R':9
+}
+VOWELS = frozenset('AEIOU')
+
+# 性情分類：身體(4,5) / 頭腦(1,8) / 情緒(2,3,6) / 直覺(7,9)
+_TEMPERAMENT_SLOT = {4: 0, 5: 0, 1: 1, 8: 1, 2: 2, 3: 2, 6: 2, 7: 3, 9: 3}
+
+# 每個字母預先攤成向量：(內驅和, 外在和, 身體, 頭腦, 情緒, 直覺)
+def _letter_vector(char):
+    val = LETTER_VALUES[char]
+    vec = [0, 0, 0, 0, 0, 0]
+    vec[0 if char in VOWELS else 1] = val
+    vec[2 + _TEMPERAMENT_SLOT[val]] = 1
+    return tuple(vec)
+
+_LETTER_VECTORS = {char: _letter_vector(char) for char in LETTER_VALUES}
+_NON_LETTERS = re.compile(r"[^A-Z]+")
+NAME_CACHE_SIZE = 4096
 
+def normalize_name(name):
+    """姓名正規化：轉大寫、只保留 A~Z (空白、標點、中文等不計分)，作為快取鍵"""
+    if not name: return ""
+    return _NON_LETTERS.sub("", name.upper())
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def _name_values(key):
+    soul = persona = 0
+    temp = [0, 0, 0, 0]
+    for char in set(key):
+        n = key.count(char)
+        v_soul, v_persona, *v_temp = _LETTER_VECTORS[char]
+        soul += v_soul * n; persona += v_persona * n
+        for i in range(4): temp[i] += v_temp[i] * n
+
+    destiny = soul + persona
     return {
-        "soul_str": format_tradition(sum_soul),
-        "soul_val": get_single_digit(sum_soul),
-        "persona_str": format_tradition(sum_persona),
-        "persona_val": get_single_digit(sum_persona),
-        "destiny_str": format_tradition(sum_destiny),
-        "destiny_val": get_single_digit(sum_destiny),
-        "temperament_string": temp_str 
+        "soul_str": format_tradition(soul),
+        "soul_val": get_single_digit(soul),
+        "persona_str": format_tradition(persona),
+        "persona_val": get_single_digit(persona),
+        "destiny_str": format_tradition(destiny),
+        "destiny_val": get_single_digit(destiny),
+        "temperament_string": "-".join(map(str, temp))
     }
 
+def calculate_name_values(name):
+    """姓名數值 (內驅 / 外在 / 事業 / 性情)，以正規化後的姓名為鍵做 LRU 快取"""
+    return dict(_name_values(normalize_name(name)))
+
+def name_cache_info():
+    """姓名快取命中統計 (hits / misses / maxsize / currsize)"""
+    return _name_values.cache_info()
+
+def clear_name_cache():
+    _name_values.cache_clear()
+
 # ==========================================
 # 3. PDS 全方位三角形演算法 (M+O)
 # ==========================================
@@ -108,16 +125,27 @@ def calculate_triangle_full(y, m, d):
 # ==========================================
 # 4. 綜合分析主介面
 # ==========================================
+def _birthdate_values(birthdate):
+    """生日這一半的數值：1900~2100 直接查表，範圍外才即時運算。"""
+    row = pds_date_table.lookup(birthdate)
+    if row is not None:
+        return row
+    y, m, d = birthdate.year, birthdate.month, birthdate.day
+    tri = calculate_triangle_full(y, m, d)
+    row = {"all_sum": get_digit_sum(y) + get_digit_sum(m) + get_digit_sum(d), "inner": tri['advanced']['inner']}
+    row.update(tri['地基']); row.update(tri['核心'])
+    return row
+
 def calculate_chart(birthdate, eng_name):
     y, m, d = birthdate.year, birthdate.month, birthdate.day
-    all_sum = sum(int(c) for c in f"{y:04d}{m:02d}{d:02d}")
+    row = _birthdate_values(birthdate)
+    all_sum = row['all_sum']
     
     name_data = calculate_name_values(eng_name)
-    tri = calculate_triangle_full(y, m, d)
     
     lpn_single = get_single_digit(all_sum)
     current_year = datetime.date.today().year
-    py_num = get_single_digit(sum(int(c) for c in str(current_year)) + m + d)
+    py_num = get_single_digit(get_digit_sum(current_year) + m + d)
     mat_val = lpn_single + name_data['destiny_val']
     
     return {
@@ -127,88 +155,257 @@ def calculate_chart(birthdate, eng_name):
         "special": name_data['persona_str'],
         "career": name_data['destiny_str'],
         "temperament": name_data['temperament_string'], # ✅ 這裡就是 Key!
-        "inner": tri['advanced']['inner'],
+        "inner": row['inner'],
         "py": py_num,
-        "anchor": tri['anchor'],
+        "anchor": f"{row['M']}{row['N']}{row['O']}",
         "maturity": get_single_digit(mat_val),
-        "restrict": tri['核心']['M'],
+        "restrict": row['M'],
         "svg_params": {
-            'O': tri['核心']['O'], 'M': tri['核心']['M'], 'N': tri['核心']['N'],
-            'I': tri['地基']['I'], 'J': tri['地基']['J'], 'K': tri['地基']['K'], 'L': tri['地基']['L']
+            'O': row['O'], 'M': row['M'], 'N': row['N'],
+            'I': row['I'], 'J': row['J'], 'K': row['K'], 'L': row['L']
         }
     }
 
+# --- 批次版：一次算 N 人，回傳欄位陣列 ---
+_ANCHOR_STRINGS = np.array([f"{i:03d}" for i in range(1000)], dtype=object)
+
+def calculate_charts(birthdates, names):
+    """
+    批次版 calculate_chart：N 個生日 + N 個英文名 → {欄位: 長度 N 的陣列}
+    欄位與 calculate_chart 相同 (svg_params 攤平成 I~O 七欄)，另附 lpn_single (主命數)。
+    數值欄為 numpy int 陣列，字串欄為 object 陣列。
+    """
+    birthdates = list(birthdates); names = list(names)
+    if len(birthdates) != len(names):
+        raise ValueError("birthdates 與 names 長度必須相同")
+    n = len(birthdates)
+
+    # 1. 生日這一半：整批從查表取值，超出 1900~2100 的少數人逐筆補算
+    table = pds_date_table.get_table()
+    idx = np.fromiter((bd.toordinal() for bd in birthdates), dtype=np.int64, count=n) - pds_date_table.FIRST_DATE.toordinal()
+    in_range = (idx >= 0) & (idx < pds_date_table.TABLE_SIZE)
+    safe_idx = np.where(in_range, idx, 0)
+    tri = {k: np.frombuffer(table[k], dtype=np.uint8)[safe_idx].astype(np.int64)
+           for k in ("all_sum", "I", "J", "K", "L", "M", "N", "O", "inner")}
+    for i in np.flatnonzero(~in_range):
+        row = _birthdate_values(birthdates[i])
+        for k in tri: tri[k][i] = row[k]
+
+    years = np.fromiter((bd.year for bd in birthdates), dtype=np.int64, count=n)
+    months = np.fromiter((bd.month for bd in birthdates), dtype=np.int64, count=n)
+    days = np.fromiter((bd.day for bd in birthdates), dtype=np.int64, count=n)
+
+    # 2. 姓名這一半：同名只算一次
+    unique_names = {}
+    name_idx = np.fromiter((unique_names.setdefault(nm, len(unique_names)) for nm in names), dtype=np.int64, count=n)
+    name_rows = [calculate_name_values(nm) for nm in unique_names]
+    def _name_col(key, dtype=object):
+        return np.array([r[key] for r in name_rows] or [0], dtype=dtype)[name_idx]
+
+    # 3. 組合欄位
+    all_sum = tri["all_sum"]
+    lpn_single = pds_reduction.single_digit_array(all_sum)
+    current_year = datetime.date.today().year
+    py_num = pds_reduction.single_digit_array(get_digit_sum(current_year) + months + days)
+    lpn_strings = {v: format_tradition(int(v)) for v in np.unique(all_sum)}
+
+    return {
+        "age": current_year - years,
+        "lpn": np.array([lpn_strings[v] for v in all_sum], dtype=object),
+        "lpn_single": lpn_single,
+        "soul": _name_col("soul_str"),
+        "special": _name_col("persona_str"),
+        "career": _name_col("destiny_str"),
+        "temperament": _name_col("temperament_string"),
+        "inner": tri["inner"],
+        "py": py_num,
+        "anchor": _ANCHOR_STRINGS[tri["M"] * 100 + tri["N"] * 10 + tri["O"]],
+        "maturity": pds_reduction.single_digit_array(lpn_single + _name_col("destiny_val", np.int64)),
+        "restrict": tri["M"],
+        "O": tri["O"], "M": tri["M"], "N": tri["N"],
+        "I": tri["I"], "J": tri["J"], "K": tri["K"], "L": tri["L"],
+    }
+
+_DIAMOND_KEYS = ("life_path", "p1", "p2", "p3", "p4", "c1", "c2", "c3", "c4")
+
+def calculate_diamond_charts(birthdates):
+    """
+    批次版鑽石圖：N 個生日 → {life_path, p1~p4, c1~c4, stage_end_1~3: 長度 N 的 int 陣列}
+    stage_end_k 為第 k 階段結束的年齡 (第四階段沒有上限)。
+    """
+    birthdates = list(birthdates)
+    n = len(birthdates)
+    table = pds_date_table.get_table()
+    idx = np.fromiter((bd.toordinal() for bd in birthdates), dtype=np.int64, count=n) - pds_date_table.FIRST_DATE.toordinal()
+    in_range = (idx >= 0) & (idx < pds_date_table.TABLE_SIZE)
+    safe_idx = np.where(in_range, idx, 0)
+    cols = {k: np.frombuffer(table[k], dtype=np.uint8)[safe_idx].astype(np.int64) for k in _DIAMOND_KEYS}
+    if not in_range.all():
+        engine = NineEnergyNumerology()
+        for i in np.flatnonzero(~in_range):
+            bd = birthdates[i]
+            chart = engine.calculate_diamond_chart(bd.year, bd.month, bd.day)
+            cols["life_path"][i] = chart["meta"]["life_path"]
+            for k, stage in enumerate(chart["timeline"], 1):
+                cols[f"p{k}"][i], cols[f"c{k}"][i] = stage["p_val"], stage["c_val"]
+
+    cols["stage_end_1"] = 36 - cols["life_path"]
+    cols["stage_end_2"] = cols["stage_end_1"] + 9
+    cols["stage_end_3"] = cols["stage_end_2"] + 9
+    return cols
+
 # ==========================================
 # 5. 家族動力運算
 # ==========================================
-def calculate_family_dynamics(members_data):
-    radar_counts = {i: 0 for i in range(1, 10)}
-    total_weight = 0
-    for member in members_data:
+# 三角形各位置在雷達圖的權重 (主性格 O 佔 3，其餘各 1，每人合計 9)
+_RADAR_WEIGHTS = (("O", 3), ("M", 1), ("N", 1), ("I", 1), ("J", 1), ("K", 1), ("L", 1))
+_RADAR_WEIGHT_PER_MEMBER = sum(w for _, w in _RADAR_WEIGHTS)
+_TRIGGER_SCRIPTS = {1: "「我看到你的獨立與堅持...」", 2: "「我感受到你的細膩...」", 8: "「我察覺到你的責任感...」"}
+FAMILY_TIP_LIMIT = 200  # calculate_family_dynamics 一次回傳的和解提示上限，其餘請用 iter_family_tips 分頁
+
+
+def _family_radar(members):
+    counts = dict.fromkeys(range(1, 10), 0)
+    for member in members:
         p = member['params']
-        radar_counts[p['O']] += 3
-        for k in ['M', 'N', 'I', 'J', 'K', 'L']:
-            radar_counts[p[k]] += 1
-        total_weight += 9
-
-    radar_percent = {k: round((v / total_weight) * 100, 1) for k, v in radar_counts.items()}
-    reconciliation_tips = []
-    scripts = {1: "「我看到你的獨立與堅持...」", 2: "「我感受到你的細膩...」", 8: "「我察覺到你的責任感...」"}
-
-    for i, A in enumerate(members_data):
-        for j, B in enumerate(members_data):
-            if i == j: continue
-            if A['params']['M'] == B['params']['O']:
-                num = B['params']['O']
-                reconciliation_tips.append({
-                    "from": A['name'], "to": B['name'], "trigger_num": num,
-                    "script": scripts.get(num, f"「我察覺到你的 {num} 號能量正在閃耀...」")
-                })
-    return {"radar_data": radar_percent, "tips": reconciliation_tips}
-
-def calculate_family_dynamics(members):
+        for key, weight in _RADAR_WEIGHTS:
+            if p[key] in counts:  # 0 (例如 2000 年的年份位) 不屬於任何能量，只佔權重
+                counts[p[key]] += weight
+    total_weight = len(members) * _RADAR_WEIGHT_PER_MEMBER
+    if not total_weight:
+        return {k: 0.0 for k in counts}
+    return {k: round((v / total_weight) * 100, 1) for k, v in counts.items()}
+
+
+def _members_by_o(members):
+    """依主性格 O 分桶：O 值 -> 成員索引 (遞增)"""
+    buckets = {}
+    for idx, member in enumerate(members):
+        buckets.setdefault(member['params']['O'], []).append(idx)
+    return buckets
+
+
+def iter_family_tips(members, start=0, limit=None):
     """
-    計算家族成員之間的動力關係
-    回傳格式: {'tips': [{'to': 'Name', 'script': 'Message'}]}
+    逐筆產生 M→O 和解提示 (A 的 M 等於 B 的 O 時，A 對 B 說的話)。
+    先依 O 分桶，只走真正配對到的組合：O(N + 配對數)，順序與兩兩比對相同。
+    start / limit 可用來分頁，不會先把全部提示組成 list。
     """
-    tips = []
-    
-    # 如果只有一個人
+    buckets = _members_by_o(members)
+
+    def _gen():
+        for i, a in enumerate(members):
+            for j in buckets.get(a['params']['M'], ()):
+                if i == j: continue
+                b = members[j]
+                num = b['params']['O']
+                yield {
+                    "from": a['name'], "to": b['name'], "trigger_num": num,
+                    "script": _TRIGGER_SCRIPTS.get(num, f"「我察覺到你的 {num} 號能量正在閃耀...」"),
+                }
+
+    stop = None if limit is None else start + limit
+    return itertools.islice(_gen(), start, stop)
+
+
+def count_family_tips(members):
+    """M→O 和解提示總數 (不必產生提示即可算出，分頁用)"""
+    buckets = _members_by_o(members)
+    total = 0
+    for member in members:
+        p = member['params']
+        total += len(buckets.get(p['M'], ())) - (p['M'] == p['O'])
+    return total
+
+
+# --- 兩兩關係 (只看主性格 O) ---
+RELATION_MIRROR, RELATION_COMPLEMENT, RELATION_SAME_FREQUENCY, RELATION_DIFFERENT = range(4)
+RELATION_LABELS = ("鏡像", "互補", "同頻", "異維")
+
+
+def _relation_type(mp_o, op_o):
+    # 簡單的生剋邏輯示意 (您可以換成更複雜的邏輯)
+    if mp_o == op_o:
+        return RELATION_MIRROR
+    if (mp_o + op_o) == 10:  # 例如 1+9, 2+8
+        return RELATION_COMPLEMENT
+    if abs(mp_o - op_o) % 3 == 0:  # 3-6-9, 1-4-7
+        return RELATION_SAME_FREQUENCY
+    return RELATION_DIFFERENT
+
+
+# O 值 (0-9) 兩兩的關係代碼表，相容矩陣直接以 O 向量查表
+_RELATION_TABLE = np.array([[_relation_type(a, b) for b in range(10)] for a in range(10)], dtype=np.uint8)
+_RELATION_TABLE.setflags(write=False)
+
+
+@functools.lru_cache(maxsize=None)
+def _relation_script(mp_o, op_o):
+    kind = _relation_type(mp_o, op_o)
+    if kind == RELATION_MIRROR:
+        return f"你們是鏡像關係 ({mp_o}號)。你看對方不順眼的地方，通常是你自己還沒接納的部分；你欣賞對方的，也是你擁有的天賦。"
+    if kind == RELATION_COMPLEMENT:
+        return f"你們是互補關係 ({mp_o} vs {op_o})。這是一場靈魂的合作，對方的強項剛好彌補你的盲點，請學會依賴對方。"
+    if kind == RELATION_SAME_FREQUENCY:
+        return "你們擁有相似的能量流動頻率。溝通起來應該很順暢，是能夠互相充電的好夥伴。"
+    return "你們來自不同的能量維度。這段關係是來擴張你的舒適圈的，試著用對方的視角看世界。"
+
+
+def compatibility_matrix(o_values):
+    """
+    N×N 關係代碼矩陣 (RELATION_*，uint8)：一次 numpy 查表完成，不跑 Python 雙迴圈。
+    記憶體為 N² bytes，人數很多時請改用 compatibility_summary。
+    """
+    o = np.asarray(o_values, dtype=np.intp)
+    return _RELATION_TABLE[o[:, None], o[None, :]]
+
+
+def compatibility_summary(o_values):
+    """
+    依 O 分組的相容摘要，O(N) 計算、不建 N×N 矩陣：
+      o_counts        各 O 值人數 (長度 10，索引即 O 值)
+      pair_counts     10×10，O=a 的人對 O=b 的人的有序配對數 (不含自己對自己)
+      relation_counts 各關係 (RELATION_*) 的有序配對數
+    """
+    o = np.asarray(o_values, dtype=np.intp)
+    o_counts = np.bincount(o, minlength=10)
+    pair_counts = np.outer(o_counts, o_counts) - np.diag(o_counts)
+    relation_counts = np.bincount(_RELATION_TABLE.ravel(), weights=pair_counts.ravel(),
+                                  minlength=len(RELATION_LABELS)).astype(np.int64)
+    return {"o_counts": o_counts, "pair_counts": pair_counts, "relation_counts": relation_counts}
+
+
+def iter_family_relations(members):
+    """以第一位成員為主詞，逐筆產生與其他成員的關係提示 (只有一人時回傳自我對話)"""
+    if not members:
+        return
     if len(members) < 2:
-        return {
-            'tips': [{
-                'to': members[0]['name'], 
-                'script': "自己與自己的對話，是所有關係的起點。看著這個雷達圖，哪一個面向是你目前最強大的支柱？"
-            }]
+        yield {
+            'to': members[0]['name'],
+            'script': "自己與自己的對話，是所有關係的起點。看著這個雷達圖，哪一個面向是你目前最強大的支柱？"
         }
-    
-    # 簡單的兩兩關係分析 (以第一個人為主詞，對其他人說話)
-    main_person = members[0]
-    others = members[1:]
-    
-    for other in others:
-        mp_o = main_person['params']['O']
-        op_o = other['params']['O']
-        
-        diff = abs(mp_o - op_o)
-        msg = ""
-        
-        # 簡單的生剋邏輯示意 (您可以換成更複雜的邏輯)
-        if mp_o == op_o:
-            msg = f"你們是鏡像關係 ({mp_o}號)。你看對方不順眼的地方，通常是你自己還沒接納的部分；你欣賞對方的，也是你擁有的天賦。"
-        elif (mp_o + op_o) == 10: # 例如 1+9, 2+8
-            msg = f"你們是互補關係 ({mp_o} vs {op_o})。這是一場靈魂的合作，對方的強項剛好彌補你的盲點，請學會依賴對方。"
-        elif diff % 3 == 0: # 3-6-9, 1-4-7
-            msg = f"你們擁有相似的能量流動頻率。溝通起來應該很順暢，是能夠互相充電的好夥伴。"
-        else:
-            msg = f"你們來自不同的能量維度。這段關係是來擴張你的舒適圈的，試著用對方的視角看世界。"
-            
-        tips.append({
-            'to': other['name'],
-            'script': msg
-        })
-        
-    return {'tips': tips}    
+        return
+    mp_o = members[0]['params']['O']
+    for other in members[1:]:
+        yield {'to': other['name'], 'script': _relation_script(mp_o, other['params']['O'])}
+
+
+def calculate_family_dynamics(members, tip_limit=FAMILY_TIP_LIMIT):
+    """
+    計算家族成員之間的動力關係
+    members: [{'name': ..., 'params': calculate_chart(...)['svg_params']}, ...]
+    回傳:
+      radar_data  各數字能量佔比 (%)
+      tips        M→O 和解提示 (最多 tip_limit 筆；tip_limit=None 表示全部)
+      tip_total   和解提示總數 (超過 tip_limit 時用 iter_family_tips 分頁取後續)
+      relations   第一位成員與其他人的關係提示 [{'to', 'script'}]
+    """
+    return {
+        "radar_data": _family_radar(members),
+        "tips": list(iter_family_tips(members, limit=tip_limit)),
+        "tip_total": count_family_tips(members),
+        "relations": list(iter_family_relations(members)),
+    }
 
 # ==========================================
 # 6. 九能量系統核心運算引擎 (Nine Energy Numerology Engine)
@@ -226,11 +423,7 @@ class NineEnergyNumerology:
         將數字不斷相加直到個位數 (1-9)。
         :param keep_master: 若為 True，則保留 11, 22, 33 不化約 (視需求開啟)
         """
-        while num > 9:
-            if keep_master and num in [11, 22, 33]:
-                return num
-            num = sum(int(digit) for digit in str(num))
-        return num
+        return pds_reduction.reduce_number(num, keep_master)
 
     def calculate_diamond_chart(self, year, month, day):
         """
@@ -241,6 +434,15 @@ class NineEnergyNumerology:
         :return: Dictionary 包含四個階段的年齡區間、高峰數、挑戰數
         """
         
+        # 0. 1900~2100 的生日直接查表 (Precomputed Lookup)
+        row = pds_date_table.lookup(datetime.date(year, month, day))
+        if row is not None:
+            return self._format_diamond_chart(
+                year, month, day, row["life_path"],
+                (row["p1"], row["p2"], row["p3"], row["p4"]),
+                (row["c1"], row["c2"], row["c3"], row["c4"]),
+            )
+
         # 1. 基礎數字化約 (Base Reductions)
         m_digit = self.reduce_to_single_digit(month)
         d_digit = self.reduce_to_single_digit(day)
@@ -249,11 +451,6 @@ class NineEnergyNumerology:
         # 2. 計算生命道路 (Life Path) 用於決定第一階段結束時間
         life_path = self.reduce_to_single_digit(m_digit + d_digit + y_digit)
         
-        # 3. 計算時間軸 (The Timeline)
-        age_end_1 = 36 - life_path
-        age_end_2 = age_end_1 + 9
-        age_end_3 = age_end_2 + 9
-        
         # 4. 計算高峰數 (Pinnacles - 上半圓)
         pinnacle_1 = self.reduce_to_single_digit(m_digit + d_digit)
         pinnacle_2 = self.reduce_to_single_digit(d_digit + y_digit)
@@ -266,6 +463,23 @@ class NineEnergyNumerology:
         challenge_3 = abs(challenge_1 - challenge_2)
         challenge_4 = abs(m_digit - y_digit)
 
+        return self._format_diamond_chart(
+            year, month, day, life_path,
+            (pinnacle_1, pinnacle_2, pinnacle_3, pinnacle_4),
+            (challenge_1, challenge_2, challenge_3, challenge_4),
+        )
+
+    @staticmethod
+    def _format_diamond_chart(year, month, day, life_path, pinnacles, challenges):
+        """組出鑽石圖回傳格式 (時間軸由生命道路決定)"""
+        pinnacle_1, pinnacle_2, pinnacle_3, pinnacle_4 = pinnacles
+        challenge_1, challenge_2, challenge_3, challenge_4 = challenges
+
+        # 3. 計算時間軸 (The Timeline)
+        age_end_1 = 36 - life_path
+        age_end_2 = age_end_1 + 9
+        age_end_3 = age_end_2 + 9
+
         return {
             "meta": {
                 "birthday": f"{year}/{month:02d}/{day:02d}",
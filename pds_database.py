@@ -1,42 +1,9 @@
 # pds_database.py
 # 喬鈞心學 PDS 系統 - 核心解釋資料庫
+# 內容已統一搬到 databases/interpretations.json，由 pds_interpretations 提供查詢；
+# 這裡只保留舊的 dict 名稱相容 (新程式請直接用 pds_interpretations.code_text / get_markdown)
 
-# 1. 12組聯合碼 & 坐鎮碼 (3位數) 的解釋
-PDS_CODES = {
-    # --- 坐鎮碼 / 關鍵組合 ---
-    "832": "🎤 **行走的行銷專家**：擁有8號的商業嗅覺與3號的創意表達，最終用2號的細膩收服人心。靠口才與才華吃飯的頂級配置。",
-    "123": "🎭 **天生的表演家**：1號開創+2號細節+3號表達，像孩子一樣純真快樂，在舞台上最耀眼。",
-    "459": "🌍 **跨界整合者**：4號穩健+5號冒險+9號大愛，能將不同領域資源整合，適合跨國或大型事業。",
-    "898": "💼 **商業敏銳度**：年輕時就展現出對金錢與權力的渴望，具備極強的賺錢本能。",
-    "325": "🌪️ **變動引擎**：如渦輪增壓般渴望自由與變化，絕對無法忍受枯燥的辦公室生活，需要一直動。",
-    "821": "🔥 **霸氣總裁**：8號權力+1號領導，說一不二，掌控慾強，是天生的決策者。",
-    "516": "🏠 **浪子回頭**：在外奔波(5)最終回歸家庭責任(6)，經歷動盪後追求穩定的過程。",
-    
-    # --- 你可以在此處無限新增 ---
-}
+import pds_interpretations as _interpretations
 
-# 2. 靈魂底色 (Life Path) 解釋
-LIFE_PATH_MEANINGS = {
-    1: "🔥 **1號人【開創者】**：天生的領導者，獨立、自信。適合創業、當老闆，不適合當螺絲釘。",
-    2: "💧 **2號人【協調者】**：溫柔的黏著劑，重視細節與關係。適合公關、特助、溝通橋樑。",
-    3: "✨ **3號人【創意家】**：快樂的傳播者，口才與創意是武器。適合講師、業務、表演者。",
-    4: "🏛️ **4號人【建設者】**：穩定的基石，重視秩序與安全感。適合行政、會計、建築、SOP制定。",
-    5: "🌪️ **5號人【冒險家】**：自由的靈魂，魅力與口才極佳。適合行銷、旅遊、自由業。",
-    6: "❤️ **6號人【奉獻者】**：療癒的天使，愛與責任是課題。適合醫療、照護、諮商服務。",
-    7: "🔍 **7號人【探究者】**：真理的偵探，邏輯分析力強。適合研究、學術、神祕學分析。",
-    8: "💎 **8號人【實業家】**：宏觀的操盤手，對權力財富敏銳。適合金融、企業高管、創業家。",
-    9: "🌏 **9號人【夢想家】**：圓滿的智者，大愛與人道精神。適合公益、宗教、身心靈導師。"
-}
-
-# 3. 流年運勢解釋
-PERSONAL_YEAR_MEANINGS = {
-    1: "🌱 **播種期 (Start)**：新的9年循環開始。適合創業、換工作、採取行動。種子撒下去，未來才會收穫。",
-    2: "🤝 **合作期 (Connect)**：放慢腳步，與人連結。適合談戀愛、合夥、整理細節。不要急著衝。",
-    3: "🎨 **創意期 (Create)**：能量活躍，適合學習、旅遊、展現自己。這一年會很忙碌且開心。",
-    4: "🧱 **紮根期 (Build)**：務實工作，建立秩序。這一年會感到壓力，但這是在打地基。",
-    5: "✈️ **變化期 (Change)**：預料之外的機會。適合搬家、轉職、冒險。保持彈性是關鍵。",
-    6: "🏠 **奉獻期 (Care)**：回歸家庭與責任。適合結婚、生子、療癒舊傷。是「愛」的一年。",
-    7: "🧘 **內省期 (Think)**：向內看，而非向外求。適合獨處、進修、思考人生方向。",
-    8: "💰 **收穫期 (Harvest)**：金錢與權力的兌現。過去的努力會在今年看到成果。",
-    9: "🍂 **總結期 (Finish)**：斷捨離。清理舊關係、舊物品。為明年新的開始騰出空間。"
-}
\ No newline at end of file
+# PDS_CODES / LIFE_PATH_MEANINGS / PERSONAL_YEAR_MEANINGS：第一次存取時才載入 (本模組原本的文字)
+__getattr__ = _interpretations.legacy_getattr(globals(), "pds_database")
@@ -0,0 +1,154 @@
+# pds_date_table.py
+# 喬鈞心學 PDS - 生日預運算查表 (Birthdate Lookup Table)
+# 1900/01/01 ~ 2100/12/31 每一天的生日盤數值只算一次，之後以「日序號」直接索引
+# 欄位：生命道路總和、三角形 I~O、內心數字、缺數、鑽石圖 (高峰與挑戰)
+
+import datetime
+import threading
+from array import array
+
+from pds_reduction import single_digit
+
+FIRST_DATE = datetime.date(1900, 1, 1)
+LAST_DATE = datetime.date(2100, 12, 31)
+_FIRST_ORDINAL = FIRST_DATE.toordinal()
+TABLE_SIZE = LAST_DATE.toordinal() - _FIRST_ORDINAL + 1
+
+# 每個欄位都是一條 array('B')，以 (日序號 - 1900/01/01 日序號) 為索引
+BYTE_COLUMNS = (
+    "all_sum",                              # 生日 8 碼數字總和 (生命道路化約前)
+    "I", "J", "K", "L", "M", "N", "O",      # 三角形
+    "inner",                                # 內心數字 (M+O)
+    "life_path",                            # 鑽石圖生命道路
+    "p1", "p2", "p3", "p4",                 # 高峰數
+    "c1", "c2", "c3", "c4",                 # 挑戰數
+)
+# 缺數以位元遮罩儲存 (bit n = 數字 n 缺席)，array('H')
+MASK_COLUMNS = ("missing_mask",)
+
+_lock = threading.Lock()
+_table = None
+
+
+def _digit_mask(*digits):
+    mask = 0
+    for n in digits:
+        mask |= 1 << n
+    return mask
+
+
+def _build_table():
+    """
+    建立查表。三角形與鑽石圖只依賴「月日」與年份的少數特徵 (N、年化約數)，
+    因此先以閏年 366 個月日組合算好共用區塊，再逐年拼接，避免逐日重算。
+    """
+    # 月日組合 (以閏年為準，平年時剔除 2/29)
+    month_days = []
+    for m in range(1, 13):
+        days = (datetime.date(2000 + (m == 12), m % 12 + 1, 1) - datetime.date(2000, m, 1)).days
+        month_days.extend((m, d) for d in range(1, days + 1))
+    feb29 = month_days.index((2, 29))
+
+    md_sum, md_I, md_J, md_M, md_mask, md_m_digit, md_d_digit = [], [], [], [], [], [], []
+    for m, d in month_days:
+        A, B = divmod(d, 10)
+        C, D = divmod(m, 10)
+        I, J = single_digit(A + B), single_digit(C + D)
+        M = single_digit(I + J)
+        md_sum.append(A + B + C + D)
+        md_I.append(I); md_J.append(J); md_M.append(M)
+        md_mask.append(_digit_mask(A, B, C, D, I, J, M))
+        md_m_digit.append(single_digit(m)); md_d_digit.append(single_digit(d))
+
+    # 同一組 (N, 年化約數) 的年份共用一個區塊 (K/L/N/all_sum 逐年另外填)
+    block_columns = [name for name in BYTE_COLUMNS if name not in ("all_sum", "K", "L", "N")]
+    blocks = {}
+    def _block(N, y_digit):
+        key = (N, y_digit)
+        if key not in blocks:
+            col = {name: bytearray() for name in block_columns}
+            for i in range(len(month_days)):
+                M, m_digit, d_digit = md_M[i], md_m_digit[i], md_d_digit[i]
+                O = single_digit(M + N)
+                p1 = single_digit(m_digit + d_digit)
+                p2 = single_digit(d_digit + y_digit)
+                c1 = abs(m_digit - d_digit)
+                c2 = abs(d_digit - y_digit)
+                col["I"].append(md_I[i]); col["J"].append(md_J[i])
+                col["M"].append(M); col["O"].append(O)
+                col["inner"].append(single_digit(M + O))
+                col["life_path"].append(single_digit(m_digit + d_digit + y_digit))
+                col["p1"].append(p1); col["p2"].append(p2)
+                col["p3"].append(single_digit(p1 + p2))
+                col["p4"].append(single_digit(m_digit + y_digit))
+                col["c1"].append(c1); col["c2"].append(c2)
+                col["c3"].append(abs(c1 - c2))
+                col["c4"].append(abs(m_digit - y_digit))
+            blocks[key] = col
+        return blocks[key]
+
+    cols = {name: array("B") for name in BYTE_COLUMNS}
+    missing_col = array("H")
+    for y in range(FIRST_DATE.year, LAST_DATE.year + 1):
+        E, F, G, H = y // 1000, y // 100 % 10, y // 10 % 10, y % 10
+        K, L = single_digit(E + F), single_digit(G + H)
+        N = single_digit(K + L)
+        y_sum = E + F + G + H
+        y_mask = _digit_mask(E, F, G, H, K, L, N)
+        block = _block(N, single_digit(y))
+
+        is_leap = (y % 4 == 0 and y % 100 != 0) or y % 400 == 0
+        def _take(seq):
+            return seq if is_leap else seq[:feb29] + seq[feb29 + 1:]
+
+        count = len(month_days) - (0 if is_leap else 1)
+        for name, data in block.items():
+            cols[name].frombytes(bytes(_take(data)))
+        cols["K"].frombytes(bytes([K]) * count)
+        cols["L"].frombytes(bytes([L]) * count)
+        cols["N"].frombytes(bytes([N]) * count)
+        cols["all_sum"].frombytes(bytes(y_sum + s for s in _take(md_sum)))
+        missing_col.extend(
+            ~(y_mask | mask | 1 << O) & 0x3FE
+            for mask, O in zip(_take(md_mask), _take(block["O"]))
+        )
+
+    cols["missing_mask"] = missing_col
+    return cols
+
+
+def get_table():
+    """回傳 {欄位名: array} 查表；第一次呼叫時建立 (執行緒安全)，之後直接回傳同一份。"""
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = _build_table()
+    return _table
+
+
+def date_index(birthdate):
+    """生日 → 查表索引；超出 1900~2100 範圍回傳 None (呼叫端改走即時運算)。"""
+    idx = birthdate.toordinal() - _FIRST_ORDINAL
+    if 0 <= idx < TABLE_SIZE:
+        return idx
+    return None
+
+
+def missing_digits(mask):
+    """位元遮罩 → 與 calculate_triangle_full 相同格式的缺數字串，例如 "4,6,7"。"""
+    return ",".join(str(n) for n in range(1, 10) if mask >> n & 1)
+
+
+def lookup(birthdate):
+    """
+    取得某一天的生日盤數值 (dict)；超出範圍回傳 None。
+    :param birthdate: datetime.date
+    """
+    idx = date_index(birthdate)
+    if idx is None:
+        return None
+    table = get_table()
+    row = {name: table[name][idx] for name in BYTE_COLUMNS}
+    row["missing"] = missing_digits(table["missing_mask"][idx])
+    return row
@@ -0,0 +1,143 @@
+# pds_interpretations.py
+# 喬鈞心學 PDS - 解釋資料庫 (唯一來源)
+# 坐鎮碼 / 聯合碼、靈魂底色 (生命道路)、流年運勢的文字統一放在 databases/interpretations.json，
+# 第一次查詢時載入一次：3 位數代碼建成 1000 格的陣列索引 (代碼即索引)，markdown 片段也在載入時先組好。
+# JSON 中空字串的代碼是內容團隊預留的待填欄位，保留在檔案裡，載入時略過。
+# 舊的 pds_database.py / pds_rules.py / databases/pds_rules.py 只保留相容名稱 (第一次存取時才載入)：
+# 各自原本的鍵與文字記在 JSON 的 "legacy" 區 (null 表示與主表相同)，內容不因整併而改變。
+
+import functools
+import json
+import os
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "databases", "interpretations.json")
+SCHEMA_VERSION = 2  # 2: 新增 legacy 區
+
+PDS_CODES, LIFE_PATH, PERSONAL_YEAR = "pds_codes", "life_path", "personal_year"
+TABLES = (PDS_CODES, LIFE_PATH, PERSONAL_YEAR)
+CODE_SLOTS = 1000  # 000 ~ 999
+
+# 各表預先組好的 markdown 片段格式 (文字本身已含 **粗體** 標記)
+_MARKDOWN_FORMATS = {
+    PDS_CODES: "**【{key}】** {text}",
+    LIFE_PATH: "{text}",
+    PERSONAL_YEAR: "**流年 {key}**｜{text}",
+}
+
+
+class _Store:
+    __slots__ = ("version", "texts", "markdown", "code_texts", "code_markdown", "raw", "legacy")
+
+    def __init__(self, raw):
+        version = raw.get("version")
+        if not isinstance(version, int) or version > SCHEMA_VERSION:
+            raise ValueError(f"不支援的解釋資料版本: {version!r}")
+        self.version = version
+        self.raw = {t: {str(k): v or "" for k, v in raw.get("tables", {}).get(t, {}).items()} for t in TABLES}
+        self.legacy = raw.get("legacy", {})
+        self.texts, self.markdown = {}, {}
+        for table in TABLES:
+            entries = {k: v for k, v in self.raw[table].items() if v}
+            fmt = _MARKDOWN_FORMATS[table]
+            self.texts[table] = entries
+            self.markdown[table] = {k: fmt.format(key=k, text=v) for k, v in entries.items()}
+
+        # 3 位數代碼的密集索引：int(code) 直接取值，未定義的格子為 None
+        code_texts, code_markdown = [None] * CODE_SLOTS, [None] * CODE_SLOTS
+        for code, text in self.texts[PDS_CODES].items():
+            if len(code) == 3 and code.isdigit():
+                code_texts[int(code)] = text
+                code_markdown[int(code)] = self.markdown[PDS_CODES][code]
+        self.code_texts, self.code_markdown = tuple(code_texts), tuple(code_markdown)
+
+
+@functools.lru_cache(maxsize=1)
+def _store():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return _Store(json.load(f))
+
+
+def reload():
+    """內容更新後重新載入 (下次查詢時讀檔)"""
+    _store.cache_clear()
+
+
+def data_version():
+    return _store().version
+
+
+def _code_slot(code):
+    """'832' / 832 -> 832；不是 3 位數代碼時回傳 None"""
+    if isinstance(code, int):
+        return code if 0 <= code < CODE_SLOTS else None
+    code = str(code).strip()
+    return int(code) if len(code) == 3 and code.isdigit() else None
+
+
+# --- 查詢 API ---
+def get_text(table, key, default=None):
+    """依表名與代碼取解釋文字 (key 可為 int 或 str)"""
+    if table == PDS_CODES:
+        return code_text(key, default)
+    return _store().texts[table].get(str(key), default)
+
+
+def get_markdown(table, key, default=None):
+    """依表名與代碼取預先組好的 markdown 片段"""
+    if table == PDS_CODES:
+        return code_markdown(key, default)
+    return _store().markdown[table].get(str(key), default)
+
+
+def code_text(code, default=None):
+    """坐鎮碼 / 聯合碼 (3 位數) 的解釋文字"""
+    slot = _code_slot(code)
+    text = _store().code_texts[slot] if slot is not None else None
+    return default if text is None else text
+
+
+def code_markdown(code, default=None):
+    slot = _code_slot(code)
+    md = _store().code_markdown[slot] if slot is not None else None
+    return default if md is None else md
+
+
+def life_path_text(number, default=None):
+    return get_text(LIFE_PATH, number, default)
+
+
+def personal_year_text(number, default=None):
+    return get_text(PERSONAL_YEAR, number, default)
+
+
+def as_dict(table, int_keys=False, legacy=None):
+    """
+    整張表轉成新的 dict。legacy 指定舊模組名稱 (例如 "pds_rules") 時，
+    依該模組原本的鍵與文字組出 (含空白的預留欄位)。
+    """
+    store = _store()
+    if legacy is None:
+        entries = store.texts[table]
+    else:
+        raw = store.raw[table]
+        entries = {k: raw.get(k, "") if v is None else v for k, v in store.legacy[legacy][table].items()}
+    return {int(k) if int_keys else k: v for k, v in entries.items()}
+
+
+# 舊模組的 dict 名稱 -> (表名, 鍵是否為 int)
+LEGACY_NAMES = {
+    "PDS_CODES": (PDS_CODES, False),
+    "LIFE_PATH_MEANINGS": (LIFE_PATH, True),
+    "PERSONAL_YEAR_MEANINGS": (PERSONAL_YEAR, True),
+}
+
+
+def legacy_getattr(namespace, legacy):
+    """給舊模組當 module __getattr__：第一次存取 PDS_CODES 等名稱時才讀檔，之後存回模組"""
+    def __getattr__(name):
+        if name not in LEGACY_NAMES:
+            raise AttributeError(f"module {namespace['__name__']!r} has no attribute {name!r}")
+        table, int_keys = LEGACY_NAMES[name]
+        value = namespace[name] = as_dict(table, int_keys, legacy=legacy)
+        return value
+    return __getattr__
@@ -0,0 +1,66 @@
+# pds_reduction.py
+# 喬鈞心學 PDS - 數字化約工具 (Numeric Reduction)
+# 所有「加總到個位數」的運算都走這裡：
+#   - 個位數：mod 9 公式直接算，不再反覆轉字串
+#   - 傳統寫法 "xx/y"：化約路徑以 LRU 快取
+#   - 大師數 (11/22/33)：需明確指定 keep_master 才保留
+
+import functools
+
+import numpy as np
+
+MASTER_NUMBERS = frozenset({11, 22, 33})
+
+
+def digit_sum(n):
+    """各位數字相加 (非負整數)"""
+    if n < 0:
+        raise ValueError(f"digit_sum 只接受非負整數: {n}")
+    total = 0
+    while n:
+        n, r = divmod(n, 10)
+        total += r
+    return total
+
+
+def single_digit(n):
+    """化約到個位數；9 以下 (含 0) 原樣回傳，其餘以 1 + (n-1) % 9 直接求得"""
+    if n > 9:
+        return 1 + (n - 1) % 9
+    return n
+
+
+def single_digit_array(arr):
+    """single_digit 的 numpy 向量版 (非負整數陣列)"""
+    return np.where(arr > 9, 1 + (arr - 1) % 9, arr)
+
+
+@functools.lru_cache(maxsize=1024)
+def reduction_path(n):
+    """化約路徑，例如 38 → (38, 11, 2)；9 以下只有自己"""
+    path = [n]
+    while n > 9:
+        n = digit_sum(n)
+        path.append(n)
+    return tuple(path)
+
+
+def reduce_number(n, keep_master=False):
+    """
+    數字化約 (Theosophical Reduction)
+    :param keep_master: 若為 True，化約途中遇到 11, 22, 33 即停止並保留
+    """
+    if not keep_master:
+        return single_digit(n)
+    for step in reduction_path(n):
+        if step <= 9 or step in MASTER_NUMBERS:
+            return step
+
+
+@functools.lru_cache(maxsize=1024)
+def format_tradition(n):
+    """傳統寫法：38 → "3811/2"；9 以下直接回傳數字字串"""
+    path = [str(step) for step in reduction_path(n)]
+    if len(path) == 1:
+        return path[0]
+    return f"{''.join(path[:-1])}/{path[-1]}"
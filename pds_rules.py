@@ -1,38 +1,8 @@
-# databases/pds_rules.py
+# pds_rules.py
+# 內容已統一搬到 databases/interpretations.json，由 pds_interpretations 提供查詢；
+# 這裡只保留舊的 dict 名稱相容 (新程式請直接用 pds_interpretations.code_text / get_markdown)
 
-# 1. 坐鎮碼 / 12組聯合碼解釋
-PDS_CODES = {
-    "832": "🎤 **行走的行銷專家**：擁有8號的商業嗅覺與3號的創意表達，最終用2號的細膩收服人心。",
-    "123": "🎭 **天生的表演家**：1號開創+2號細節+3號表達，像孩子一樣純真快樂。",
-    "459": "🌍 **跨界整合者**：4號穩健+5號冒險+9號大愛，適合跨國事業。",
-    "898": "💼 **商業敏銳度**：年輕時就展現出對金錢與權力的渴望。",
-    "325": "🌪️ **變動引擎**：如渦輪增壓般渴望自由與變化。",
-    "821": "🔥 **霸氣總裁**：8號權力+1號領導，說一不二。",
-    "516": "🏠 **浪子回頭**：在外奔波(5)最終回歸家庭責任(6)。",
-}
+import pds_interpretations as _interpretations
 
-# 2. 靈魂底色解釋
-LIFE_PATH_MEANINGS = {
-    1: "🔥 **1號人【開創者】**：天生的領導者，獨立、自信。",
-    2: "💧 **2號人【協調者】**：溫柔的黏著劑，重視細節與關係。",
-    3: "✨ **3號人【創意家】**：快樂的傳播者，口才與創意是武器。",
-    4: "🏛️ **4號人【建設者】**：穩定的基石，重視秩序與安全感。",
-    5: "🌪️ **5號人【冒險家】**：自由的靈魂，魅力與口才極佳。",
-    6: "❤️ **6號人【奉獻者】**：療癒的天使，愛與責任是課題。",
-    7: "🔍 **7號人【探究者】**：真理的偵探，邏輯分析力強。",
-    8: "💎 **8號人【實業家】**：宏觀的操盤手，對權力財富敏銳。",
-    9: "🌏 **9號人【夢想家】**：圓滿的智者，大愛與人道精神。"
-}
-
-# 3. 流年運勢解釋
-PERSONAL_YEAR_MEANINGS = {
-    1: "🌱 **播種期**：新的循環開始，適合創業。",
-    2: "🤝 **合作期**：放慢腳步，連結他人。",
-    3: "🎨 **創意期**：能量活躍，適合展現自己。",
-    4: "🧱 **紮根期**：務實工作，建立秩序。",
-    5: "✈️ **變化期**：預料之外的機會與變動。",
-    6: "🏠 **奉獻期**：回歸家庭，療癒舊傷。",
-    7: "🧘 **內省期**：向內看，思考人生方向。",
-    8: "💰 **收穫期**：金錢與權力的兌現。",
-    9: "🍂 **總結期**：斷捨離，清理舊物。"
-}
\ No newline at end of file
+# PDS_CODES / LIFE_PATH_MEANINGS / PERSONAL_YEAR_MEANINGS：第一次存取時才載入 (本模組原本的文字)
+__getattr__ = _interpretations.legacy_getattr(globals(), "pds_rules")
@@ -0,0 +1,98 @@
+# pds_transliteration.py
+# 喬鈞心學 PDS - 中文姓名轉威妥瑪拼音 (唯一實作)
+# 英文名字會進 calculate_name_values 影響盤面數值，所有畫面 (註冊、人生地圖、家族矩陣、批次匯入) 一律走這裡，
+# 保證同一個中文名字在哪裡轉出來都一樣。
+# 正式格式：每個字一段、只留英文字母、轉大寫、以單一空白分隔，例如 "余喬鈞" -> "YV CHIAO CHVN"。
+# - pypinyin 的字典第一次用到時才載入 (warm_up)，之後整個行程共用
+# - 整個名字一層 LRU；只有單一讀音的字另有逐字快取，整個名字都是單音字時直接組合，不必再分詞
+#   (破音字的讀音取決於前後文，例如「重慶」的重，所以含破音字的名字一定整串交給 pypinyin)
+
+import functools
+import threading
+
+NAME_CACHE_SIZE = 8192
+CHAR_CACHE_SIZE = 8192
+
+_pypinyin = None
+_warm_lock = threading.Lock()
+
+
+def warm_up():
+    """載入 pypinyin 與字典 (只做一次)；沒安裝 pypinyin 時回傳 False"""
+    global _pypinyin
+    if _pypinyin is not None:
+        return True
+    with _warm_lock:
+        if _pypinyin is None:
+            try:
+                import pypinyin
+                from pypinyin.pinyin_dict import pinyin_dict
+            except ImportError:
+                print("尚未安裝 pypinyin 套件")
+                return False
+            pypinyin.pinyin("喬鈞", style=pypinyin.Style.WADEGILES)  # 觸發詞組字典與分詞器載入
+            _pypinyin = (pypinyin, pinyin_dict)
+    return True
+
+
+def _canonical(items):
+    """pypinyin 的結果 -> 正式格式 (去掉聲調數字、撇號與空白段)"""
+    tokens = ("".join(c for c in item[0] if c.isalpha()).upper() for item in items)
+    return " ".join(t for t in tokens if t)
+
+
+@functools.lru_cache(maxsize=CHAR_CACHE_SIZE)
+def _char_token(ch):
+    """單音字的拼音段；破音字或非中文字回傳 None (需要看前後文，交給整串轉換)"""
+    pypinyin, pinyin_dict = _pypinyin
+    readings = pinyin_dict.get(ord(ch))
+    if not readings or "," in readings:
+        return None
+    return _canonical(pypinyin.pinyin(ch, style=pypinyin.Style.WADEGILES))
+
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+def _wade_giles(text):
+    tokens = []
+    for ch in text:
+        token = _char_token(ch)
+        if token is None:
+            break
+        tokens.append(token)
+    else:
+        return " ".join(t for t in tokens if t)
+    pypinyin, _ = _pypinyin
+    return _canonical(pypinyin.pinyin(text, style=pypinyin.Style.WADEGILES))
+
+
+def to_wade_giles(text):
+    """中文姓名 -> 威妥瑪拼音 (大寫，空白分隔)；空字串或無法轉換時回傳 "" """
+    if not text:
+        return ""
+    text = str(text).strip()
+    if not text or not warm_up():
+        return ""
+    try:
+        return _wade_giles(text)
+    except Exception:
+        return ""
+
+
+def to_wade_giles_many(names):
+    """批次轉換 (給匯入用)：回傳與輸入等長的列表，重複的名字只算一次"""
+    names = list(names)
+    done = {}
+    for name in names:
+        if name not in done:
+            done[name] = to_wade_giles(name)
+    return [done[name] for name in names]
+
+
+def cache_info():
+    """整個名字 / 逐字快取的命中統計"""
+    return {"names": _wade_giles.cache_info(), "chars": _char_token.cache_info()}
+
+
+def clear_cache():
+    _wade_giles.cache_clear()
+    _char_token.cache_clear()
@@ -1,5 +1,12 @@
 # views/__init__.py
-from . import tab_life_map
-from . import tab_divination
-from . import tab_member
-from . import tab_family_matrix
\ No newline at end of file
+# 分頁模組不在套件載入時 import (見 views/lazy_views.py)；
+# 保留 views.tab_xxx 的屬性寫法，第一次存取時才載入。
+import importlib
+
+_LAZY_SUBMODULES = ("tab_life_map", "tab_divination", "tab_member", "tab_family_matrix")
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,22 +1,9 @@
 import streamlit as st
 import time
-import os
-from supabase import create_client
+from views import data_access
 
 # --- 連線設定 ---
-@st.cache_resource
-def init_connection():
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_KEY")
-    if not url or not key:
-        try:
-            url = st.secrets["supabase"]["url"]
-            key = st.secrets["supabase"]["key"]
-        except: pass
-    if url and key: return create_client(url, key)
-    return None
-
-supabase = init_connection()
+supabase = data_access.get_auth_client()
 
 def render_auth():
     """顯示登入/註冊頁面"""
@@ -0,0 +1,97 @@
+# 檔案路徑: views/card_export.py
+# 批次匯出能量圖卡：以多行程平行產圖，每張卡完成就寫進 ZIP，
+# 同時在途的工作數有上限，記憶體中只會有少數幾張圖的 bytes，不會一次握住全部 PIL Image。
+import concurrent.futures as cf
+import os
+import re
+import zipfile
+
+from views import card_generator
+
+FORMATS = {"PNG": "png", "WEBP": "webp"}
+MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+IN_FLIGHT_PER_WORKER = 2  # 每個行程最多排 2 張，其餘等前面完成再送出
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def _card_filename(idx, profile, ext):
+    name = _UNSAFE_CHARS.sub("_", str(profile.get("name") or "card")).strip("_") or "card"
+    return f"{idx + 1:03d}_{name}.{ext}"
+
+
+def _render(profile, fmt):
+    # 子行程執行的進入點 (必須是模組層級函式才能 pickle)
+    # 單張失敗 (例如生日格式錯誤) 回傳錯誤訊息，不中斷整批匯出
+    try:
+        return card_generator.render_energy_card_bytes(profile, fmt), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+
+def _run_serial(profiles, fmt, skip=()):
+    for idx, profile in enumerate(profiles):
+        if idx not in skip:
+            yield (idx, *_render(profile, fmt))
+
+
+def _run_pool(profiles, fmt, max_workers):
+    window = max_workers * IN_FLIGHT_PER_WORKER
+    with cf.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        queue = iter(enumerate(profiles))
+        for idx, profile in queue:
+            pending[pool.submit(_render, profile, fmt)] = idx
+            if len(pending) >= window: break
+        while pending:
+            done, _ = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+            for fut in done:
+                yield (pending.pop(fut), *fut.result())
+                nxt = next(queue, None)
+                if nxt is not None:
+                    pending[pool.submit(_render, nxt[1], fmt)] = nxt[0]
+
+
+def iter_cards(profiles, fmt="PNG", max_workers=None):
+    """
+    依完成順序逐張產出 (索引, 圖檔 bytes, 錯誤訊息)；產圖失敗時 bytes 為 None。
+    max_workers=1 或無法建立行程池時，改在目前行程依序產生。
+    """
+    fmt = fmt.upper()
+    if fmt not in FORMATS:
+        raise ValueError(f"不支援的圖檔格式: {fmt}")
+    profiles = list(profiles)
+    workers = min(max_workers or MAX_WORKERS, len(profiles))
+    if workers <= 1:
+        yield from _run_serial(profiles, fmt)
+        return
+    finished = set()
+    try:
+        for idx, data, error in _run_pool(profiles, fmt, workers):
+            finished.add(idx)
+            yield idx, data, error
+    except (OSError, NotImplementedError, cf.process.BrokenProcessPool):
+        # 部分主機不允許開子行程；已完成的不重做，其餘改為單行程
+        yield from _run_serial(profiles, fmt, skip=finished)
+
+
+def export_cards_zip(profiles, dest, fmt="PNG", max_workers=None, progress=None):
+    """
+    把每位親友的能量圖卡寫入 dest (檔案路徑或可寫入的檔案物件) 的 ZIP。
+    progress(處理張數, 總張數) 會在每張卡處理後呼叫。
+    回傳 (寫入張數, [(姓名, 錯誤訊息), ...])；產圖失敗的親友會略過並列在後者。
+    """
+    profiles = list(profiles)
+    total = len(profiles)
+    ext = FORMATS.get(fmt.upper(), "png")
+    count, failed = 0, []
+    # PNG / WEBP 本身已壓縮，ZIP 只做封裝 (ZIP_STORED) 省下重複壓縮的時間
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_STORED) as zf:
+        for done, (idx, data, error) in enumerate(iter_cards(profiles, fmt=fmt, max_workers=max_workers), 1):
+            if data is None:
+                failed.append((profiles[idx].get("name") or f"#{idx + 1}", error))
+            else:
+                zf.writestr(_card_filename(idx, profiles[idx], ext), data)
+                count += 1
+            if progress: progress(done, total)
+    return count, failed
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import io
 import os
 import random
@@ -7,9 +8,13 @@ from datetime import date
 import qrcode
 from PIL import Image, ImageDraw, ImageFont
 
-from views import life_map_ui
+import pds_core
+from views import chart_cache
 
 FONT_PATH = os.path.join(os.path.dirname(__file__), "..", "assets", "NotoSansTC-Bold.ttf")
+CARD_SIZE = (1080, 1680)
+QR_URL = "https://jq-pds-app-1.onrender.com"
+QR_SIZE = 220
 
 
 def _safe_date(value):
@@ -25,29 +30,52 @@ def _safe_date(value):
     return datetime.date.today()
 
 
+@functools.lru_cache(maxsize=None)
 def _load_font(size):
+    """字型依字級快取；同一字級整個行程只讀一次 TTF"""
     try:
         return ImageFont.truetype(FONT_PATH, size)
     except (OSError, IOError):
         return ImageFont.load_default()
 
 
-def _compose_chart(target):
+def _chart_args(target):
     bd = _safe_date(target.get("birthdate", datetime.date.today()))
     name = target.get("name") or target.get("full_name") or "九能量會員"
+    return bd, name
+
+
+def _compose_chart(target):
     try:
-        return life_map_ui.pds_core.calculate_chart(bd, name)
+        return chart_cache.get_chart(*_chart_args(target))
     except Exception:
         return {}
 
 
-def _draw_gradient(draw, width, height):
-    for y in range(height):
-        ratio = y / max(height - 1, 1)
-        r = int(6 + ratio * 25)
-        g = int(12 + ratio * 18)
-        b = int(40 + ratio * 55)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
+def _gradient_color(y, height):
+    ratio = y / max(height - 1, 1)
+    return (int(6 + ratio * 25), int(12 + ratio * 18), int(40 + ratio * 55))
+
+
+@functools.lru_cache(maxsize=4)
+def _background_layer(width, height):
+    """
+    靜態底圖 (漸層) 只算一次：先做 1 像素寬的色帶再橫向放大，
+    結果與原本逐行畫線相同。呼叫端請用 .copy()，不要直接在快取上作畫。
+    """
+    column = Image.new("RGB", (1, height))
+    column.putdata([_gradient_color(y, height) for y in range(height)])
+    return column.resize((width, height), Image.NEAREST)
+
+
+@functools.lru_cache(maxsize=1)
+def _qr_layer():
+    """固定網址的 QR 圖 (已縮放)，整個行程只產生一次"""
+    qr = qrcode.QRCode(border=1, box_size=4)
+    qr.add_data(QR_URL)
+    qr.make(fit=True)
+    qr_img = qr.make_image(fill_color="#1b1b1f", back_color="white").convert("RGB")
+    return qr_img.resize((QR_SIZE, QR_SIZE))
 
 
 def calculate_age(birth_date):
@@ -161,33 +189,23 @@ def _render_triangle(draw, card, chart):
 
 
 def _render_qrcode(card):
-    qr = qrcode.QRCode(border=1, box_size=4)
-    qr.add_data("https://jq-pds-app-1.onrender.com")
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="#1b1b1f", back_color="white").convert("RGB")
-    qr_w = qr_img.size[0]
-    qr_target_size = 220
-    qr_resized = qr_img.resize((qr_target_size, qr_target_size))
-    card.paste(qr_resized, (card.size[0] - qr_target_size - 90, card.size[1] - qr_target_size - 90))
+    # QR 會壓到三角形底邊，必須在三角形之後貼上，因此不併入底圖，只快取 QR 圖本身
+    left, top = card.size[0] - QR_SIZE - 90, card.size[1] - QR_SIZE - 90
+    card.paste(_qr_layer(), (left, top))
     draw = ImageDraw.Draw(card)
-    font = _load_font(24)
-    draw.text(
-        (card.size[0] - qr_target_size - 90, card.size[1] - qr_target_size - 120),
-        "掃碼連到九能量導覽",
-        font=font,
-        fill=(255, 255, 255),
-    )
+    draw.text((left, top - 30), "掃碼連到九能量導覽", font=_load_font(24), fill=(255, 255, 255))
 
 
-def generate_energy_card(user_data):
+def generate_energy_card(user_data, chart=None):
     """
     產生專屬的九能量圖卡：包含核心指標、三角形與 QR。
+    底圖、字型與 QR 皆為快取，每張卡只畫姓名、數字與三角形節點。
+    chart 可傳入已算好的命盤 (批次匯出的子行程沒有 session 快取可用)。
     """
-    width, height = 1080, 1680
-    card = Image.new("RGB", (width, height), "#050714")
+    card = _background_layer(*CARD_SIZE).copy()
     draw = ImageDraw.Draw(card)
-    _draw_gradient(draw, width, height)
-    chart = _compose_chart(user_data)
+    if chart is None:
+        chart = _compose_chart(user_data)
     birthdate = _safe_date(user_data.get("birthdate"))
     display_bd = birthdate.strftime("%Y/%m/%d")
     current_age = calculate_age(birthdate)
@@ -197,6 +215,21 @@ def generate_energy_card(user_data):
     return card
 
 
+def render_energy_card_bytes(user_data, fmt="PNG"):
+    """
+    產生圖卡並直接編碼成 PNG / WEBP bytes (供批次匯出的子行程使用)。
+    子行程沒有 Streamlit session，命盤直接以 pds_core 計算，不走 chart_cache。
+    """
+    try:
+        chart = pds_core.calculate_chart(*_chart_args(user_data))
+    except Exception:
+        chart = {}
+    card = generate_energy_card(user_data, chart=chart)
+    buf = io.BytesIO()
+    card.save(buf, format=fmt)
+    return buf.getvalue()
+
+
 def calculate_age(birth_date):
     """計算精準年齡"""
     today = date.today()
@@ -207,16 +240,15 @@ def generate_divination_card(username, core_word, message):
     """
     生成宇宙指引圖卡：帶有圓圈與指引文字
     """
-    width, height = 1080, 1680
+    width, height = CARD_SIZE
     bg_path = os.path.join(os.path.dirname(__file__), "..", "assets", "universe_bg.png")
     try:
         card = Image.open(bg_path).convert("RGB")
         if card.size != (width, height):
             card = card.resize((width, height))
     except (FileNotFoundError, OSError):
-        card = Image.new("RGB", (width, height), "#03071b")
+        card = _background_layer(width, height).copy()
         draw = ImageDraw.Draw(card)
-        _draw_gradient(draw, width, height)
         for _ in range(220):
             x = random.randint(0, width - 1)
             y = random.randint(0, height - 1)
@@ -0,0 +1,37 @@
+# 檔案路徑: views/chart_cache.py
+# 同一個 session 內共用的命盤快取：人生地圖、家族矩陣、能量圖卡都從這裡取盤，
+# 同一人 (生日 + 英文名) 每年只算一次；跨年時流年 (py) 與年齡會變，整包自動作廢。
+import datetime
+import streamlit as st
+
+import pds_core
+
+_SESSION_KEY = "_chart_cache"
+MAX_CHARTS = 512  # 單一 session 最多保留的命盤數 (超過時淘汰最早放入的)
+
+
+def _store():
+    year = datetime.date.today().year
+    store = st.session_state.get(_SESSION_KEY)
+    if not store or store.get("year") != year:
+        store = {"year": year, "charts": {}}
+        st.session_state[_SESSION_KEY] = store
+    return store
+
+
+def get_chart(birthdate, english_name):
+    """取得 pds_core.calculate_chart 的結果 (快取鍵：生日、正規化英文名、當前年份)"""
+    charts = _store()["charts"]
+    key = (birthdate, pds_core.normalize_name(english_name))
+    chart = charts.get(key)
+    if chart is None:
+        chart = pds_core.calculate_chart(birthdate, english_name)
+        if len(charts) >= MAX_CHARTS:
+            charts.pop(next(iter(charts)))
+        charts[key] = chart
+    return chart
+
+
+def clear():
+    """清空本 session 的命盤快取"""
+    st.session_state.pop(_SESSION_KEY, None)
@@ -0,0 +1,152 @@
+# 檔案路徑: views/chart_export.py
+# 「下載我的矩陣」：把使用者全部 saved_charts 連同盤面 (calculate_charts) 與鑽石圖欄位串流匯出成
+# CSV / JSON Lines / Parquet。資料以 keyset 分頁從 Supabase 一頁一頁讀，每頁整批計算後立刻寫出，
+# 記憶體只放一頁，不必先把整個 friends_raw 讀進來 (無限制會員也一樣)。
+# Parquet 需要 pyarrow (選用)；沒裝時只提供 CSV / JSONL。
+import csv
+import datetime
+import io
+import json
+
+import pds_core
+from views import data_access
+
+EXPORT_PAGE_SIZE = 500
+
+BASE_COLUMNS = ("id", "name", "english_name", "birth_date", "category", "created_at")
+CHART_COLUMNS = ("age", "lpn", "lpn_single", "soul", "special", "career", "temperament", "inner", "py",
+                 "anchor", "maturity", "restrict", "I", "J", "K", "L", "M", "N", "O")
+DIAMOND_COLUMNS = ("life_path", "p1", "p2", "p3", "p4", "c1", "c2", "c3", "c4",
+                   "stage_end_1", "stage_end_2", "stage_end_3")
+COLUMNS = BASE_COLUMNS + CHART_COLUMNS + DIAMOND_COLUMNS
+_TEXT_COLUMNS = set(BASE_COLUMNS) | {"lpn", "soul", "special", "career", "temperament", "anchor"}
+
+# 顯示名稱 -> (副檔名, MIME)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_formats():
+    return [f for f in FORMATS if f != "Parquet" or parquet_available()]
+
+
+def iter_saved_chart_pages(client, line_user_id, page_size=EXPORT_PAGE_SIZE):
+    """
+    依 (created_at, id) 的 keyset 分頁逐頁讀取 saved_charts (不用 OFFSET，每頁成本相同)；
+    created_at 為空的舊資料排在最後，翻到那一段時只比 id。
+    """
+    cursor = None
+    while True:
+        query = client.table("saved_charts").select(data_access.SAVED_CHART_COLUMNS)\
+            .eq("line_user_id", line_user_id)
+        if cursor:
+            created_at, last_id = cursor
+            if created_at is None:
+                query = query.or_(f"and(created_at.is.null,id.gt.{last_id})")
+            else:
+                query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{last_id}),'
+                                  'created_at.is.null')
+        rows = query.order("created_at", nullsfirst=False).order("id").limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def _parse_date(value):
+    try:
+        return datetime.datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_page(rows):
+    """一頁 saved_charts -> 匯出列 (整批計算盤面與鑽石圖；生日無效的列只留基本欄位)"""
+    out = [{c: row.get(c) for c in BASE_COLUMNS} for row in rows]
+    valid = [(i, bd) for i, bd in ((i, _parse_date(r.get("birth_date"))) for i, r in enumerate(rows)) if bd]
+    if not valid:
+        return out
+    positions, birthdates = zip(*valid)
+    names = [rows[i].get("english_name") or "" for i in positions]
+    fields = {**pds_core.calculate_charts(birthdates, names), **pds_core.calculate_diamond_charts(birthdates)}
+    columns = {c: fields[c].tolist() for c in CHART_COLUMNS + DIAMOND_COLUMNS}
+    for j, i in enumerate(positions):
+        for c, values in columns.items():
+            out[i][c] = values[j]
+    return out
+
+
+def iter_export_pages(client, line_user_id, page_size=EXPORT_PAGE_SIZE):
+    """逐頁產出已計算好的匯出列 (generator，一次只有一頁在記憶體)"""
+    for rows in iter_saved_chart_pages(client, line_user_id, page_size):
+        yield compute_page(rows)
+
+
+def _write_csv(pages, dest):
+    text = io.TextIOWrapper(dest, encoding="utf-8-sig", newline="")  # 帶 BOM，Excel 直接開不亂碼
+    writer = csv.DictWriter(text, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for page in pages:
+        writer.writerows(page)
+        count += len(page)
+    text.flush()
+    text.detach()
+    return count
+
+
+def _write_jsonl(pages, dest):
+    count = 0
+    for page in pages:
+        dest.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in page).encode("utf-8"))
+        count += len(page)
+    return count
+
+
+def _write_parquet(pages, dest):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.string() if c in _TEXT_COLUMNS else pa.int64()) for c in COLUMNS])
+    count = 0
+    with pq.ParquetWriter(dest, schema) as writer:
+        for page in pages:  # 每頁一個 row group
+            columns = {c: [None if row.get(c) is None else (str(row[c]) if c in _TEXT_COLUMNS else row[c])
+                           for row in page] for c in COLUMNS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            count += len(page)
+    return count
+
+
+_WRITERS = {"CSV": _write_csv, "JSONL": _write_jsonl, "Parquet": _write_parquet}
+
+
+def export_charts(client, line_user_id, dest, fmt="CSV", page_size=EXPORT_PAGE_SIZE, progress=None):
+    """
+    把使用者全部親友檔案 (含計算欄位) 寫到二進位檔案物件 dest，回傳寫出的列數。
+    progress(n) 每寫完一頁回報一次累計列數。
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"不支援的格式: {fmt}")
+
+    def _pages():
+        done = 0
+        for page in iter_export_pages(client, line_user_id, page_size):
+            yield page
+            done += len(page)
+            if progress:
+                progress(done)
+
+    return _WRITERS[fmt](_pages(), dest)
@@ -0,0 +1,130 @@
+# 檔案路徑: views/chart_import.py
+# 親友檔案批次匯入 (CSV / Excel)：讀檔 -> 欄位對應與日期驗證 -> 空白英文名一次批次轉威妥瑪拼音
+# -> 依會員額度截斷 -> 多列一次 insert 分批寫入 saved_charts。
+# 只處理資料，不碰畫面；寫入後由呼叫端執行 data_access.invalidate_saved_charts。
+import datetime
+import os
+
+import pandas as pd
+
+import pds_transliteration
+
+INSERT_CHUNK_SIZE = 200  # 每次 insert 的列數
+MIN_BIRTH_DATE = datetime.date(1900, 1, 1)
+DEFAULT_CATEGORY = "未分類"
+
+# 標準欄位 -> 檔案中可接受的欄名 (不分大小寫，前後空白忽略)
+COLUMN_ALIASES = {
+    "name": ("name", "姓名", "中文名", "名字"),
+    "english_name": ("english_name", "english name", "英文名", "英文名字"),
+    "birth_date": ("birth_date", "birthdate", "birthday", "出生日期", "生日"),
+    "category": ("category", "分類", "類別"),
+}
+REQUIRED_COLUMNS = ("name", "birth_date")
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y%m%d")
+
+
+def read_table(file, filename):
+    """依副檔名讀入 CSV / XLSX，所有欄位一律當字串 (保留前導 0，日期自行解析)"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(file, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    if ext in (".xlsx", ".xlsm"):
+        return pd.read_excel(file, dtype=str, keep_default_na=False, engine="openpyxl")
+    raise ValueError(f"不支援的檔案格式: {ext or filename}")
+
+
+def _map_columns(df):
+    lookup = {str(c).strip().lower(): c for c in df.columns}
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias.lower() in lookup:
+                mapping[field] = lookup[alias.lower()]
+                break
+    missing = [f for f in REQUIRED_COLUMNS if f not in mapping]
+    if missing:
+        raise ValueError(f"缺少必要欄位: {', '.join(missing)} (可用欄名: 姓名 / 出生日期)")
+    return mapping
+
+
+def parse_birth_date(value):
+    """字串或日期 -> datetime.date；格式不對或超出範圍時拋出 ValueError"""
+    if isinstance(value, datetime.datetime):
+        day = value.date()
+    elif isinstance(value, datetime.date):
+        day = value
+    else:
+        text = str(value).strip()
+        if not text:
+            raise ValueError("出生日期空白")
+        text = text.split(" ")[0].split("T")[0]  # Excel 日期轉字串會帶 00:00:00
+        for fmt in _DATE_FORMATS:
+            try:
+                day = datetime.datetime.strptime(text, fmt).date()
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"無法辨識的日期: {value}")
+    if not MIN_BIRTH_DATE <= day <= datetime.date.today():
+        raise ValueError(f"日期超出範圍: {day}")
+    return day
+
+
+def prepare_rows(df, existing=(), default_category=DEFAULT_CATEGORY):
+    """
+    驗證並整理匯入資料，回傳 (rows, errors)。
+    rows: [{name, english_name, birth_date, category}]；errors: [(檔案列號, 原因)]。
+    existing 可傳已存在的 (姓名, 出生日期字串)，重複的列會略過 (檔案內重複也一樣)。
+    """
+    mapping = _map_columns(df)
+    seen = set(existing)
+    rows, errors = [], []
+    for offset, record in enumerate(df.to_dict("records")):
+        line_no = offset + 2  # 第 1 列是標題
+        name = str(record.get(mapping["name"], "")).strip()
+        if not name:
+            errors.append((line_no, "姓名空白"))
+            continue
+        try:
+            birth_date = parse_birth_date(record.get(mapping["birth_date"], "")).isoformat()
+        except ValueError as e:
+            errors.append((line_no, str(e)))
+            continue
+        if (name, birth_date) in seen:
+            errors.append((line_no, f"重複的資料: {name} {birth_date}"))
+            continue
+        seen.add((name, birth_date))
+        english_name = str(record.get(mapping.get("english_name"), "")).strip() if "english_name" in mapping else ""
+        category = str(record.get(mapping.get("category"), "")).strip() if "category" in mapping else ""
+        rows.append({
+            "name": name,
+            "english_name": english_name,
+            "birth_date": birth_date,
+            "category": category or default_category,
+        })
+
+    # 空白英文名一次批次轉換 (同名只轉一次)
+    blanks = [r for r in rows if not r["english_name"]]
+    for row, eng in zip(blanks, pds_transliteration.to_wade_giles_many(r["name"] for r in blanks)):
+        row["english_name"] = eng
+    return rows, errors
+
+
+def apply_limit(rows, map_limit, current_used):
+    """依會員額度截斷，回傳 (可匯入的列, 超出額度被略過的列數)"""
+    remaining = max(0, map_limit - current_used)
+    return rows[:remaining], max(0, len(rows) - remaining)
+
+
+def insert_rows(client, line_user_id, username, rows, chunk_size=INSERT_CHUNK_SIZE, progress=None):
+    """多列一次 insert，分批寫入 saved_charts；progress(done, total) 每批回報一次。回傳寫入的列數。"""
+    total, done = len(rows), 0
+    for start in range(0, total, chunk_size):
+        chunk = [{"line_user_id": line_user_id, "username": username, **row} for row in rows[start:start + chunk_size]]
+        client.table("saved_charts").insert(chunk).execute()
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return done
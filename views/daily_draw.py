@@ -0,0 +1,69 @@
+# 檔案路徑: views/daily_draw.py
+# 每日宇宙指引的抽牌引擎：牌由 hash(line_user_id, 日期) 對牌組張數取餘數決定，
+# 同一人同一天永遠是同一張 (O(1)，不必先查 daily_draws 才知道今天抽到什麼)；
+# 寫入一律 upsert 並忽略重複，rerun 連點也不會多出第二筆。
+#
+# daily_draws 需有唯一鍵 (一次性)：
+#   alter table daily_draws add constraint daily_draws_user_date_key unique (line_user_id, draw_date);
+#
+# ⚠️ 牌組 (databases/card_rules.py) 的張數一變，之後每一天的對應都會改變 (已存的紀錄不受影響)。
+import datetime
+import hashlib
+
+DRAW_SALT = b"jq-pds-daily-draw-v1"
+UPSERT_BATCH_SIZE = 500
+
+
+def card_index(line_user_id, day, deck_size):
+    """(使用者, 日期) -> 牌組索引；跨行程、跨機器結果一致 (不依賴 Python 的 hash 隨機化)"""
+    if deck_size <= 0:
+        raise ValueError("牌組是空的")
+    h = hashlib.blake2b(f"{line_user_id}|{day.isoformat()}".encode("utf-8"), digest_size=8, key=DRAW_SALT)
+    return int.from_bytes(h.digest(), "big") % deck_size
+
+
+def draw_card(line_user_id, day, deck):
+    """取得某人某天的牌 (回傳牌卡 dict 的複本，可放心修改)"""
+    return dict(deck[card_index(line_user_id, day, len(deck))])
+
+
+def draw_row(line_user_id, day, deck, username=None):
+    """組成 daily_draws 的一列"""
+    card = draw_card(line_user_id, day, deck)
+    return {
+        "line_user_id": line_user_id,
+        "username": username,
+        "draw_date": day.isoformat(),
+        "title": card["title"],
+        "poem": card["poem"],
+        "desc": card["desc"],
+        "image_url": card.get("image_url", ""),
+        "created_at": datetime.datetime.now().isoformat(),
+    }
+
+
+def draw_schedule(line_user_ids, start, end, deck, usernames=None):
+    """
+    預先排好一段期間 (含頭尾) 每人每天的牌，逐列產出 daily_draws 的資料。
+    usernames 可傳 {line_user_id: 姓名}。
+    """
+    usernames = usernames or {}
+    days = (end - start).days
+    for uid in line_user_ids:
+        for offset in range(days + 1):
+            yield draw_row(uid, start + datetime.timedelta(days=offset), deck, usernames.get(uid))
+
+
+def save_draws(client, rows, batch_size=UPSERT_BATCH_SIZE):
+    """批次 upsert 到 daily_draws；(line_user_id, draw_date) 已存在的列直接略過。回傳送出的列數。"""
+    sent, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            client.table("daily_draws").upsert(batch, on_conflict="line_user_id,draw_date", ignore_duplicates=True).execute()
+            sent += len(batch)
+            batch = []
+    if batch:
+        client.table("daily_draws").upsert(batch, on_conflict="line_user_id,draw_date", ignore_duplicates=True).execute()
+        sent += len(batch)
+    return sent
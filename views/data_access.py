@@ -0,0 +1,105 @@
+# 檔案路徑: views/data_access.py
+# 資料存取層：全站共用一個 Supabase client (走 db_client 的連線池)，並把每次 rerun 都會讀的
+# saved_charts / users 以「每位使用者」為單位快取 (TTL)，寫入後由呼叫端明確作廢。
+import os
+import threading
+import time
+import streamlit as st
+
+import db_client
+
+CACHE_TTL = 300  # 秒；資料若沒被寫入，最多 5 分鐘重新讀一次
+
+# 只取畫面真正用到的欄位 (避免 select("*") 把整列拉回來)
+SAVED_CHART_COLUMNS = "id, name, english_name, birth_date, category, created_at"
+USER_COLUMNS = "line_user_id, username, full_name, english_name, birth_date, email, phone, tier, role"
+
+
+def get_secret_value(section, key, default=None):
+    """環境變數 (SECTION_KEY) 優先，其次 st.secrets"""
+    value = os.environ.get(f"{section}_{key}".upper())
+    if value: return value
+    try:
+        return st.secrets.get(section, {}).get(key, default)
+    except Exception:
+        return default
+
+
+@st.cache_resource
+def get_client():
+    """全站共用的 Supabase client；各頁面一律由此取得，不再各自 create_client"""
+    url = get_secret_value("supabase", "url")
+    key = get_secret_value("supabase", "key")
+    if url and key: return db_client.create_pooled_client(url, key)
+    return None
+
+
+@st.cache_resource
+def get_auth_client():
+    """
+    帳密登入 (supabase.auth) 專用 client：登入狀態會存在 client 物件上，
+    因此不與資料查詢共用同一個物件，但仍共用同一條連線池。
+    """
+    url = get_secret_value("supabase", "url")
+    key = get_secret_value("supabase", "key")
+    if url and key: return db_client.create_pooled_client(url, key)
+    return None
+
+
+# --- 每位使用者的 TTL 快取 ---
+_cache = {}  # (資料表, line_user_id) -> (到期時間, 資料)
+_lock = threading.Lock()
+
+
+def _cached(table, line_user_id, loader):
+    key = (table, line_user_id)
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+    data = loader()
+    with _lock:
+        _cache[key] = (now + CACHE_TTL, data)
+    return data
+
+
+def _invalidate(table, line_user_id):
+    with _lock:
+        _cache.pop((table, line_user_id), None)
+
+
+def fetch_saved_charts(line_user_id):
+    """取得使用者的親友檔案 (依建立時間排序)。回傳新的 list，可放心修改。"""
+    client = get_client()
+    if not client or not line_user_id: return []
+
+    def _load():
+        res = client.table("saved_charts").select(SAVED_CHART_COLUMNS)\
+            .eq("line_user_id", line_user_id).order("created_at").execute()
+        return res.data or []
+
+    return [dict(row) for row in _cached("saved_charts", line_user_id, _load)]
+
+
+def fetch_user(line_user_id):
+    """取得 users 表中本人那一列；查無資料回傳 None。"""
+    client = get_client()
+    if not client or not line_user_id: return None
+
+    def _load():
+        res = client.table("users").select(USER_COLUMNS).eq("line_user_id", line_user_id).execute()
+        return res.data[0] if res.data else None
+
+    row = _cached("users", line_user_id, _load)
+    return dict(row) if row else None
+
+
+def invalidate_saved_charts(line_user_id):
+    """saved_charts 有新增 / 修改 / 刪除後呼叫"""
+    _invalidate("saved_charts", line_user_id)
+
+
+def invalidate_user(line_user_id):
+    """users 有更新後呼叫"""
+    _invalidate("users", line_user_id)
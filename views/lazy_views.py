@@ -0,0 +1,72 @@
+# 檔案路徑: views/lazy_views.py
+# 分頁模組的延遲載入登記處：各分頁第一次被畫出來時才 import (之後留在 sys.modules，整個行程只付一次)，
+# 登入頁不必先載入 pandas、pypinyin、PIL、qrcode 等只有分頁才用得到的套件。
+# 每個模組第一次載入的耗時記在 import_profile()；設定環境變數 PDS_IMPORT_PROFILE=1 時也會印到 log。
+# 註：巢狀依賴 (例如 pds_core) 的成本算在第一個載入它的分頁上。
+import importlib
+import os
+import threading
+import time
+
+VIEWS = {
+    "ads_manager": "views.ads_manager",
+    "auth_ui": "views.auth_ui",
+    "tab_life_map": "views.tab_life_map",
+    "tab_divination": "views.tab_divination",
+    "tab_family_matrix": "views.tab_family_matrix",
+    "tab_journal": "views.tab_journal",
+    "tab_member": "views.tab_member",
+}
+
+PROFILE_LOG = os.environ.get("PDS_IMPORT_PROFILE") == "1"
+
+_modules = {}
+_profile = {}   # name -> {"seconds": float, "ok": bool, "error": str | None}
+_lock = threading.Lock()
+
+
+def load(name):
+    """取得分頁模組 (第一次呼叫時才 import)；載入失敗會拋出原本的例外，下次呼叫再重試"""
+    module = _modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        module = _modules.get(name)
+        if module is not None:
+            return module
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(VIEWS[name])
+        except Exception as e:
+            _record(name, time.perf_counter() - start, e)
+            raise
+        _record(name, time.perf_counter() - start)
+        _modules[name] = module
+        return module
+
+
+def is_loaded(name):
+    return name in _modules
+
+
+def _record(name, seconds, error=None):
+    _profile[name] = {"seconds": seconds, "ok": error is None, "error": str(error) if error else None}
+    if PROFILE_LOG:
+        status = "ok" if error is None else f"失敗: {error}"
+        print(f"⏱️ import {VIEWS[name]}: {seconds * 1000:.1f} ms ({status})")
+
+
+def import_profile():
+    """已載入分頁的 import 耗時，由慢到快：[(name, seconds, ok), ...]"""
+    return sorted(((n, p["seconds"], p["ok"]) for n, p in _profile.items()), key=lambda r: r[1], reverse=True)
+
+
+if __name__ == "__main__":
+    # 逐一載入所有分頁，列出冷啟動時各自的成本：python -m views.lazy_views
+    for view in VIEWS:
+        try:
+            load(view)
+        except Exception as e:
+            print(f"⚠️ {view} 載入失敗: {e}")
+    for view, seconds, ok in import_profile():
+        print(f"{view:<20} {seconds * 1000:8.1f} ms {'' if ok else '(失敗)'}")
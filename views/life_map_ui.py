@@ -1,6 +1,5 @@
 # 檔案路徑: views/life_map_ui.py
 import streamlit as st
-import textwrap
 import datetime
 
 # --- 嘗試匯入核心計算模組 ---
@@ -24,6 +23,8 @@ except ImportError:
                 return {'timeline': []}
     pds_core = MockPDS()
 
+from views import chart_cache, pyramid_svg
+
 # --- 輔助函式：顯示資訊列 ---
 def _render_info_row(label, value, color="#333", is_header=False):
     fw = "800" if is_header else "600"
@@ -35,46 +36,13 @@ def _render_info_row(label, value, color="#333", is_header=False):
     </div>
     """, unsafe_allow_html=True)
 
-# --- 核心函式：繪製 SVG 金字塔 ---
-def draw_pyramid_svg(chart_data, bd):
-    p = chart_data.get('svg_params', {})
-    s_d, s_m, s_y = f"{bd.day:02d}", f"{bd.month:02d}", f"{bd.year:04d}"
-    color_main, color_fill = "#6a3093", "#ffffff"
-    stroke_width, font_style = 3, f'font-family: sans-serif; font-weight: bold; fill: {color_main};'
-    box_style = f'fill="{color_fill}" stroke="{color_main}" stroke-width="{stroke_width}" rx="15"'
-
-    svg_content = textwrap.dedent(f"""
-    <defs>
-        <symbol id="star" viewBox="0 0 24 24">
-            <path fill="{color_main}" d="M12 2l3.09 6.26L22 9.27l-5 4.87 1.18 6.88L12 17.77l-6.18 3.25L7 14.14 2 9.27l6.91-1.01L12 2z"/>
-        </symbol>
-    </defs>
-    <use href="#star" x="288" y="-17" width="24" height="24" />
-    <use href="#star" x="18" y="283" width="24" height="24" />
-    <use href="#star" x="558" y="283" width="24" height="24" />
-    <line x1="300" y1="20" x2="50" y2="280" stroke="{color_main}" stroke-width="{stroke_width}" stroke-linecap="round" />
-    <line x1="50" y1="280" x2="550" y2="280" stroke="{color_main}" stroke-width="{stroke_width}" stroke-linecap="round" />
-    <line x1="300" y1="20" x2="550" y2="280" stroke="{color_main}" stroke-width="{stroke_width}" stroke-linecap="round" />
-    <line x1="300" y1="120" x2="300" y2="280" stroke="{color_main}" stroke-width="{stroke_width}" />
-    <line x1="175" y1="190" x2="425" y2="190" stroke="{color_main}" stroke-width="{stroke_width}" />
-    <g transform="translate(300, 80)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('O','?')}</text></g>
-    <g transform="translate(210, 150)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('M','?')}</text></g>
-    <g transform="translate(390, 150)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('N','?')}</text></g>
-    <g transform="translate(150, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('I','?')}</text></g>
-    <g transform="translate(250, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('J','?')}</text></g>
-    <g transform="translate(350, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('K','?')}</text></g>
-    <g transform="translate(450, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('L','?')}</text></g>
-    <g transform="translate(150, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_d}</text></g>
-    <g transform="translate(250, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_m}</text></g>
-    <g transform="translate(350, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_y[:2]}</text></g>
-    <g transform="translate(450, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_y[2:]}</text></g>
-    """)
-    return f'<svg viewBox="0 -40 600 450" style="width:100%; max-width:500px; margin: 0 auto; display: block;">{svg_content}</svg>'
+# --- 核心函式：繪製 SVG 金字塔 (模板與快取見 views/pyramid_svg.py) ---
+draw_pyramid_svg = pyramid_svg.draw_pyramid_svg
 
 # --- 主渲染入口：顯示 4 大分頁 ---
 def render_energy_tabs(display_bd, display_name):
-    # 計算數據
-    chart = pds_core.calculate_chart(display_bd, display_name)
+    # 計算數據 (同一 session 共用快取)
+    chart = chart_cache.get_chart(display_bd, display_name)
     
     # 分頁展示
     t1, t2, t3, t4 = st.tabs(["本命盤 (核心)", "性情數字", "天賦三角形", "高峰與挑戰"])
@@ -0,0 +1,68 @@
+# 檔案路徑: views/pyramid_svg.py
+# 天賦三角形 SVG：模板在模組載入時編譯一次，之後只替換 7 個三角形數字與生日；
+# 同一組 (I, J, K, L, M, N, O, 生日) 的結果以 LRU 快取，切換親友時直接取用。
+import functools
+import string
+import textwrap
+
+COLOR_MAIN, COLOR_FILL = "#6a3093", "#ffffff"
+STROKE_WIDTH = 3
+SVG_CACHE_SIZE = 1024
+
+_FONT_STYLE = f'font-family: sans-serif; font-weight: bold; fill: {COLOR_MAIN};'
+_BOX_STYLE = f'fill="{COLOR_FILL}" stroke="{COLOR_MAIN}" stroke-width="{STROKE_WIDTH}" rx="15"'
+
+
+def _node(x, y, field):
+    return (f'<g transform="translate({x}, {y})"><rect x="-25" y="-25" width="50" height="50" {_BOX_STYLE} />'
+            f'<text x="0" y="8" text-anchor="middle" font-size="24" {_FONT_STYLE}>${field}</text></g>')
+
+
+def _date_label(x, y, field):
+    return (f'<g transform="translate({x}, {y})">'
+            f'<text x="0" y="8" text-anchor="middle" font-size="28" {_FONT_STYLE}>${field}</text></g>')
+
+
+# 固定不變的線條 / 星星只組一次，動態欄位留 $O、$M... 給 string.Template 替換
+_TEMPLATE = string.Template(
+    '<svg viewBox="0 -40 600 450" style="width:100%; max-width:500px; margin: 0 auto; display: block;">'
+    + textwrap.dedent(f"""
+    <defs>
+        <symbol id="star" viewBox="0 0 24 24">
+            <path fill="{COLOR_MAIN}" d="M12 2l3.09 6.26L22 9.27l-5 4.87 1.18 6.88L12 17.77l-6.18 3.25L7 14.14 2 9.27l6.91-1.01L12 2z"/>
+        </symbol>
+    </defs>
+    <use href="#star" x="288" y="-17" width="24" height="24" />
+    <use href="#star" x="18" y="283" width="24" height="24" />
+    <use href="#star" x="558" y="283" width="24" height="24" />
+    <line x1="300" y1="20" x2="50" y2="280" stroke="{COLOR_MAIN}" stroke-width="{STROKE_WIDTH}" stroke-linecap="round" />
+    <line x1="50" y1="280" x2="550" y2="280" stroke="{COLOR_MAIN}" stroke-width="{STROKE_WIDTH}" stroke-linecap="round" />
+    <line x1="300" y1="20" x2="550" y2="280" stroke="{COLOR_MAIN}" stroke-width="{STROKE_WIDTH}" stroke-linecap="round" />
+    <line x1="300" y1="120" x2="300" y2="280" stroke="{COLOR_MAIN}" stroke-width="{STROKE_WIDTH}" />
+    <line x1="175" y1="190" x2="425" y2="190" stroke="{COLOR_MAIN}" stroke-width="{STROKE_WIDTH}" />
+    """)
+    + "\n".join([
+        _node(300, 80, "O"), _node(210, 150, "M"), _node(390, 150, "N"),
+        _node(150, 240, "I"), _node(250, 240, "J"), _node(350, 240, "K"), _node(450, 240, "L"),
+        _date_label(150, 340, "day"), _date_label(250, 340, "month"),
+        _date_label(350, 340, "century"), _date_label(450, 340, "year"),
+    ])
+    + "\n</svg>"
+)
+
+
+@functools.lru_cache(maxsize=SVG_CACHE_SIZE)
+def render_pyramid_svg(I, J, K, L, M, N, O, birthdate):
+    """依三角形 7 個數字與生日組出 SVG 字串 (結果快取)"""
+    s_y = f"{birthdate.year:04d}"
+    return _TEMPLATE.substitute(
+        I=I, J=J, K=K, L=L, M=M, N=N, O=O,
+        day=f"{birthdate.day:02d}", month=f"{birthdate.month:02d}",
+        century=s_y[:2], year=s_y[2:],
+    )
+
+
+def draw_pyramid_svg(chart_data, bd):
+    """由 calculate_chart 的結果 (svg_params) 與生日畫出天賦三角形"""
+    p = chart_data.get('svg_params', {})
+    return render_pyramid_svg(*(p.get(k, '?') for k in "IJKLMNO"), bd)
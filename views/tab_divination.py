@@ -1,9 +1,6 @@
 import streamlit as st
 import datetime
-import random
-import pandas as pd
-import os
-from supabase import create_client, Client
+from views import daily_draw, data_access, write_behind
 
 # ==============================================================================
 # 0. 資源與設定 (Configuration & Assets)
@@ -114,82 +111,64 @@ def inject_custom_css():
 # 1. Supabase 資料庫邏輯 (Backend Logic)
 # ==============================================================================
 
-@st.cache_resource
-def init_supabase():
-    # 優先從環境變數讀取 (Render 模式)
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_KEY")
-    
-    # 如果環境變數不存在，才嘗試讀取 st.secrets (本地模式)
-    if not url or not key:
-        try:
-            url = st.secrets["supabase"]["url"]
-            key = st.secrets["supabase"]["key"]
-        except:
-            st.error("🚫 找不到 Supabase 金鑰配置")
-            return None
-    return create_client(url, key)
-
-supabase = init_supabase()
+# 全站共用 client (環境變數優先，其次 st.secrets)
+supabase = data_access.get_client()
 
 def get_today_str():
     return datetime.datetime.now().strftime("%Y-%m-%d")
 
-def check_today_draw():
-    """使用永久 ID 檢查今日是否已抽牌"""
-    today = get_today_str()
-    line_id = st.session_state.get("line_user_id") # 💡 改讀 ID
-    if not line_id: return None
-    
-    try:
-        response = supabase.table("daily_draws")\
-            .select("*")\
-            .eq("line_user_id", line_id)\
-            .eq("draw_date", today)\
-            .execute()
-        
-        if response.data: return response.data[0]
-        return None
-    except Exception as e:
-        st.error(f"資料庫連線錯誤: {e}")
-        return None
+# 抽牌紀錄存在 session：同一天內只查一次 daily_draws，抽完直接補進來，不必 rerun 後再查
+_HISTORY_KEY = "_draw_history"
+_HISTORY_COLUMNS = ("draw_date", "title", "poem", "desc", "image_url")  # 足以直接重現當天那張牌
 
-def save_draw_result(card_data):
-    """儲存結果：同時鎖定 ID 與 儲存當時姓名"""
-    today = get_today_str()
+def save_draw_result():
+    """
+    儲存結果：同時鎖定 ID 與 儲存當時姓名。
+    先寫入本機緩衝立即返回，背景再 upsert 到資料庫 (同一天重複送出會被略過)。
+    """
+    if not supabase: return False
     line_id = st.session_state.get("line_user_id")
     display_name = st.session_state.get("username")
-    
-    payload = {
-        "line_user_id": line_id,   # 💡 永久門牌
-        "username": display_name,   # 💡 當時稱呼
-        "draw_date": today,
-        "title": card_data["title"],
-        "poem": card_data["poem"],
-        "desc": card_data["desc"],
-        "image_url": card_data.get("image_url", ""),
-        "created_at": datetime.datetime.now().isoformat()
-    }
-    
+    payload = daily_draw.draw_row(line_id, datetime.date.today(), DIVINATION_CARDS, display_name)
+
     try:
-        supabase.table("daily_draws").insert(payload).execute()
-        return True
+        write_behind.get_buffer(supabase).put(
+            f"daily_draws:{line_id}:{payload['draw_date']}", "daily_draws", "upsert", payload,
+            on_conflict="line_user_id,draw_date", line_user_id=line_id)
     except Exception as e:
         st.error(f"儲存失敗: {e}")
         return False
 
+    cached = st.session_state.get(_HISTORY_KEY)
+    if cached and cached["line_id"] == line_id and cached["date"] == payload["draw_date"]:
+        rows = [r for r in cached["rows"] if r["draw_date"] != payload["draw_date"]]
+        cached["rows"] = ([{k: payload.get(k) for k in _HISTORY_COLUMNS}] + rows)[:7]
+    return True
+
 def get_draw_history():
     """取得過去 7 天的靈魂軌跡 (認 ID)"""
     line_id = st.session_state.get("line_user_id")
+    today = get_today_str()
+    cached = st.session_state.get(_HISTORY_KEY)
+    if cached and cached["line_id"] == line_id and cached["date"] == today:
+        return cached["rows"]
     try:
         response = supabase.table("daily_draws")\
-            .select("draw_date, title, poem")\
+            .select(", ".join(_HISTORY_COLUMNS))\
             .eq("line_user_id", line_id)\
             .order("draw_date", desc=True)\
             .limit(7)\
             .execute()
-        return response.data
+        rows = response.data or []
     except: return []
+    # 還在寫入緩衝、尚未送到資料庫的抽牌紀錄也算進來
+    saved_dates = {r["draw_date"] for r in rows}
+    for p in write_behind.get_buffer(supabase).pending("daily_draws", line_id):
+        if p["row"]["draw_date"] not in saved_dates:
+            rows.append({k: p["row"].get(k) for k in _HISTORY_COLUMNS})
+    rows = sorted(rows, key=lambda r: r["draw_date"], reverse=True)[:7]
+    st.session_state[_HISTORY_KEY] = {"line_id": line_id, "date": today, "rows": rows}
+    return rows
 
 # ==============================================================================
 # 2. UI 渲染邏輯 (Frontend Views)
@@ -225,24 +204,27 @@ def render_divination_view(friends_raw=None):
 
     st.header(f"🔮 {display_name} 的每日宇宙指引") # 💡 顯示姓名
     
-    # 1. 檢查今日狀態
-    today_record = check_today_draw()
+    # 1. 檢查今日狀態 (近 7 天紀錄同一天只查一次；今天的牌本身不必查)
+    history = get_draw_history()
+    drawn_today = bool(history) and history[0].get("draw_date") == get_today_str()
 
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        if today_record:
+        if drawn_today:
             st.info(f"📅 今日指引已送達")
-            render_card_ui(today_record, is_new=False)
+            # 以當天存下的紀錄為準 (舊版隨機抽的、或牌組異動前抽的牌，不一定等於 hash 算出的牌)
+            saved = history[0]
+            card = {"title": saved.get("title") or "", "poem": saved.get("poem") or "", "desc": saved.get("desc") or ""}
+            if saved.get("image_url"): card["image_url"] = saved["image_url"]
+            render_card_ui(card, is_new=False)
         else:
             st.markdown('<div style="text-align: center; padding: 40px;">🃏<p>連結宇宙能量...</p></div>', unsafe_allow_html=True)
             if st.button("🔮 連結宇宙・抽取指引", use_container_width=True):
-                picked_card = random.choice(DIVINATION_CARDS)
-                if save_draw_result(picked_card):
+                if save_draw_result():
                     st.rerun()
 
     st.markdown("---")
     with st.expander("📜 查看過去 7 天的靈魂軌跡"):
-        history = get_draw_history()
         if history:
             for item in history:
                 st.markdown(f"""
@@ -2,7 +2,9 @@ import streamlit as st
 import datetime
 import time
 import os
-from supabase import create_client, Client
+import tempfile
+import pds_transliteration
+from views import chart_cache, data_access, pyramid_svg
 
 # --- 核心模組匯入 (保持 PDS 核心不變) ---
 try:
@@ -21,22 +23,13 @@ except ImportError:
                 'svg_params': {'O':6,'M':3,'N':3,'I':1,'J':2,'K':2,'L':1},
                 'triangle_codes': ['12-3', '45-9'] * 6
             }
+        def calculate_charts(self, bds, names):
+            charts = [self.calculate_chart(bd, name) for bd, name in zip(bds, names)]
+            return {'lpn_single': [c['lpn'] for c in charts], 'O': [c['svg_params']['O'] for c in charts]}
     pds_core = MockPDS()
 
-# --- 資料庫連線 ---
-@st.cache_resource
-def init_connection():
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_KEY")
-    if not url or not key:
-        try:
-            url = st.secrets["supabase"]["url"]
-            key = st.secrets["supabase"]["key"]
-        except: pass
-    if url and key: return create_client(url, key)
-    return None
-
-supabase = init_connection()
+# --- 資料庫連線 (全站共用 client) ---
+supabase = data_access.get_client()
 
 # --- 資料存取函式 ---
 def _get_my_profile(username):
@@ -51,26 +44,9 @@ def _get_my_profile(username):
     except: return None
 
 # ==========================================
-# ★ 新增：中文轉威妥瑪拼音的魔法函式
+# ★ 中文轉威妥瑪拼音 (實作統一在 pds_transliteration，這裡保留原有名稱)
 # ==========================================
-def get_wade_giles(text):
-    """將中文姓名轉換為威妥瑪拼音 (大寫)"""
-    if not text: return ""
-    try:
-        from pypinyin import pinyin, Style
-        # 轉換為威妥瑪拼音 (會帶有數字聲調，例如 CHUN1)
-        raw_pinyin = pinyin(text, style=Style.WADEGILES)
-        result = []
-        for item in raw_pinyin:
-            # 移除非英文字母的字元 (過濾掉數字)，並轉成大寫
-            clean_text = ''.join([c for c in item[0] if c.isalpha()]).upper()
-            result.append(clean_text)
-        return " ".join(result) # 以空格分隔，例如：YU CHIAO CHUN
-    except ImportError:
-        print("尚未安裝 pypinyin 套件")
-        return ""
-    except Exception:
-        return ""
+get_wade_giles = pds_transliteration.to_wade_giles
 
 
 # --- 資料存取函式 ---
@@ -83,12 +59,7 @@ def get_user_charts():
         st.warning("⚠️ 尚未取得 LINE ID，無法讀取數據")
         return []
     try:
-        # 💡 查詢語法：eq("user_id", "joe1369")
-        response = supabase.table("saved_charts") \
-            .select("*") \
-            .eq("line_user_id", line_id) \
-            .execute()
-        return response.data
+        return data_access.fetch_saved_charts(line_id)
     except Exception as e:
         st.error(f"讀取資料庫失敗: {e}")
         return []
@@ -106,17 +77,21 @@ def _save_chart(line_id, name, eng, bd, uid=None, is_me=False):
                 "english_name": eng, 
                 "birth_date": bd_str
             }, on_conflict="line_user_id").execute()
+            data_access.invalidate_user(line_id)
         else:
             if uid: # 更新
                 supabase.table("saved_charts").update({"name": name, "english_name": eng, "birth_date": bd_str}).eq("id", uid).execute()
             else: # 新增：這裡 user_id 必須填入真實 ID
                 supabase.table("saved_charts").insert({"line_user_id": line_id, "name": name, "english_name": eng, "birth_date": bd_str}).execute()
+            data_access.invalidate_saved_charts(line_id)
     except Exception as e: 
         st.error(f"存檔失敗: {e}")
 
 def _delete_chart(chart_id):
     if not supabase: return
-    try: supabase.table("saved_charts").delete().eq("id", chart_id).execute()
+    try:
+        supabase.table("saved_charts").delete().eq("id", chart_id).execute()
+        data_access.invalidate_saved_charts(st.session_state.get("line_user_id"))
     except: pass
 
 # --- UI 輔助元件 ---
@@ -130,37 +105,185 @@ def _render_info_row(label, value, color="#333", is_header=False):
     </div>
     """, unsafe_allow_html=True)
 
-# --- SVG 繪圖 ---
-def _draw_pyramid_svg(chart_data, bd):
-    p = chart_data.get('svg_params', {})
-    s_d = f"{bd.day:02d}"
-    s_m = f"{bd.month:02d}"
-    s_y = f"{bd.year:04d}"
-    color_main, color_fill = "#6a3093", "#ffffff"
-    stroke_width, font_style = 2, 'font-family: sans-serif; font-weight: bold; fill: #6a3093;'
-    box_style = f'fill="{color_fill}" stroke="{color_main}" stroke-width="{stroke_width}" rx="5"'
-
-    svg = f"""
-<svg viewBox="0 0 600 420" style="width:100%; max-width:500px; margin: 0 auto; display: block;">
-<defs><marker id="arrow" markerWidth="10" markerHeight="10" refX="5" refY="5" orient="auto"><path d="M0,0 L0,10 L10,5 z" fill="{color_main}" /></marker></defs>
-<path d="M300,20 L50,280 L550,280 Z" fill="none" stroke="{color_main}" stroke-width="3" />
-<line x1="300" y1="120" x2="300" y2="280" stroke="{color_main}" stroke-width="2" />
-<line x1="175" y1="190" x2="425" y2="190" stroke="{color_main}" stroke-width="2" />
-<g transform="translate(300, 80)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('O','?')}</text></g>
-<g transform="translate(210, 150)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('M','?')}</text></g>
-<g transform="translate(390, 150)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('N','?')}</text></g>
-<g transform="translate(150, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('I','?')}</text></g>
-<g transform="translate(250, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('J','?')}</text></g>
-<g transform="translate(350, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('K','?')}</text></g>
-<g transform="translate(450, 240)"><rect x="-25" y="-25" width="50" height="50" {box_style} /><text x="0" y="8" text-anchor="middle" font-size="24" {font_style}>{p.get('L','?')}</text></g>
-<line x1="50" y1="280" x2="550" y2="280" stroke="{color_main}" stroke-width="2" />
-<g transform="translate(150, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_d}</text></g>
-<g transform="translate(250, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_m}</text></g>
-<g transform="translate(350, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_y[:2]}</text></g>
-<g transform="translate(450, 340)"><text x="0" y="8" text-anchor="middle" font-size="28" {font_style}>{s_y[2:]}</text></g>
-</svg>
-"""
-    return svg
+def _render_card_export(all_profiles):
+    """整批產生能量圖卡並打包成 ZIP (多行程產圖，邊完成邊寫入暫存檔)"""
+    from views import card_export
+
+    with st.expander("📦 批次匯出能量圖卡", expanded=False):
+        fmt = st.radio("圖檔格式", list(card_export.FORMATS), horizontal=True, key="card_export_fmt")
+        if st.button(f"產生 {len(all_profiles)} 張圖卡", key="card_export_run"):
+            bar = st.progress(0.0, text="圖卡產生中...")
+
+            def _progress(done, total):
+                bar.progress(done / total, text=f"圖卡產生中... {done} / {total}")
+
+            profiles = [
+                {"name": p.get("name"), "english_name": p.get("english_name", ""), "birthdate": p.get("birthdate")}
+                for p in all_profiles
+            ]
+            # ZIP 留在磁碟暫存檔，session 只記路徑；下載後即刪除
+            _discard_export_file("card_export_path")
+            fd, path = tempfile.mkstemp(prefix="energy_cards_", suffix=".zip")
+            with os.fdopen(fd, "wb") as tmp:
+                written, failed = card_export.export_cards_zip(profiles, tmp, fmt=fmt, progress=_progress)
+            st.session_state.card_export_path = path
+            bar.empty()
+            if failed:
+                st.warning(f"⚠️ {len(failed)} 張圖卡無法產生，已略過：" + "、".join(f"{n} ({e})" for n, e in failed[:10]))
+
+        _render_export_download("card_export_path", "⬇️ 下載圖卡 ZIP",
+                                f"energy_cards_{datetime.date.today():%Y%m%d}.zip", "application/zip",
+                                "card_export_download")
+
+def _discard_export_file(state_key):
+    """刪除 session 記住的匯出暫存檔"""
+    path = st.session_state.pop(state_key, None)
+    if path:
+        try: os.remove(path)
+        except OSError: pass
+
+def _render_export_download(state_key, label, file_name, mime, button_key):
+    """從磁碟暫存檔提供下載 (不把整個檔案留在 session)；按下下載後刪檔"""
+    path = st.session_state.get(state_key)
+    if not path: return
+    if not os.path.exists(path):
+        st.session_state.pop(state_key, None)
+        return
+    with open(path, "rb") as f:
+        st.download_button(label, data=f, file_name=file_name, mime=mime, key=button_key,
+                           on_click=_discard_export_file, args=(state_key,))
+
+def _render_chart_export(line_id):
+    """下載我的矩陣：全部親友檔案連同計算欄位，逐頁讀取計算後寫入暫存檔"""
+    from views import chart_export
+
+    with st.expander("📤 下載我的矩陣 (CSV / JSONL / Parquet)", expanded=False):
+        fmt = st.radio("檔案格式", chart_export.available_formats(), horizontal=True, key="chart_export_fmt")
+        if st.button("產生匯出檔", key="chart_export_run"):
+            if not supabase:
+                st.error("⚠️ 無法連線至資料庫，請稍後再試。")
+                return
+            status = st.empty()
+            # 匯出檔留在磁碟暫存檔，session 只記路徑與格式；下載後即刪除
+            _discard_export_file("chart_export_path")
+            ext, _ = chart_export.FORMATS[fmt]
+            fd, path = tempfile.mkstemp(prefix="my_matrix_", suffix=f".{ext}")
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    count = chart_export.export_charts(
+                        supabase, line_id, tmp, fmt=fmt,
+                        progress=lambda n: status.caption(f"匯出中... 已處理 {n} 筆"))
+                st.session_state.chart_export_path = path
+                st.session_state.chart_export_format = fmt
+                status.caption(f"✅ 共 {count} 筆")
+            except Exception as e:
+                os.remove(path)
+                status.empty()
+                st.error(f"⚠️ 匯出失敗: {e}")
+
+        ext, mime = chart_export.FORMATS[st.session_state.get("chart_export_format", "CSV")]
+        _render_export_download("chart_export_path", "⬇️ 下載匯出檔",
+                                f"my_matrix_{datetime.date.today():%Y%m%d}.{ext}", mime,
+                                "chart_export_download")
+
+def _render_bulk_import(line_id, all_profiles, map_limit, current_used):
+    """CSV / Excel 批次匯入親友檔案 (驗證日期、自動補英文名、依額度截斷、分批寫入)"""
+    from views import chart_import
+
+    with st.expander("📥 批次匯入親友 (CSV / Excel)", expanded=False):
+        st.caption("必要欄位：姓名、出生日期 (例如 1990-01-31)；選填：英文名 (空白自動產生)、分類")
+        # 匯入完成後換一個 key，清掉已上傳的檔案
+        upload_key = f"chart_import_file_{st.session_state.get('chart_import_round', 0)}"
+        uploaded = st.file_uploader("選擇檔案", type=["csv", "xlsx"], key=upload_key)
+        if not uploaded: return
+
+        existing = {(p["name"], p["birthdate"].isoformat()) for p in all_profiles if p.get("type") == "friend"}
+        try:
+            df = chart_import.read_table(uploaded, uploaded.name)
+            rows, errors = chart_import.prepare_rows(df, existing=existing)
+        except Exception as e:
+            st.error(f"⚠️ 檔案讀取失敗: {e}")
+            return
+        rows, over_limit = chart_import.apply_limit(rows, map_limit, current_used)
+
+        st.write(f"可匯入 **{len(rows)}** 筆")
+        if over_limit:
+            st.warning(f"⚠️ 超出會員額度 ({map_limit} 位)，後面 {over_limit} 筆不會匯入")
+        if errors:
+            with st.expander(f"略過 {len(errors)} 列", expanded=False):
+                for line_no, reason in errors[:200]:
+                    st.caption(f"第 {line_no} 列：{reason}")
+        if rows:
+            st.dataframe(rows[:20], use_container_width=True, hide_index=True)
+
+        if rows and st.button(f"匯入 {len(rows)} 筆", type="primary", key="chart_import_run"):
+            if not supabase:
+                st.error("⚠️ 無法連線至資料庫，請稍後再試。")
+                return
+            bar = st.progress(0.0, text="匯入中...")
+            try:
+                done = chart_import.insert_rows(
+                    supabase, line_id, st.session_state.get("username", "未知用戶"), rows,
+                    progress=lambda n, total: bar.progress(n / total, text=f"匯入中... {n} / {total}"))
+            except Exception as e:
+                data_access.invalidate_saved_charts(line_id)  # 可能已寫入部分批次，重新讀取
+                st.error(f"⚠️ 寫入資料庫失敗: {e}")
+                return
+            data_access.invalidate_saved_charts(line_id)
+            st.toast(f"✅ 已匯入 {done} 筆親友檔案")
+            st.session_state.chart_import_round = st.session_state.get("chart_import_round", 0) + 1
+            st.rerun()
+
+_COMPAT_COLORS = ["#6a3093", "#e91e63", "#4caf50", "#b0bec5"]  # 鏡像 / 互補 / 同頻 / 異維
+COMPAT_MATRIX_MAX_MEMBERS = 60  # 超過此人數改畫 O 分組熱圖，不建 N×N 矩陣
+
+def _render_compatibility(all_profiles, o_values):
+    """相容矩陣熱圖：人數少時逐人呈現，人數多時依主性格 O 分組統計配對數"""
+    if len(all_profiles) < 2: return
+    import plotly.graph_objects as go
+
+    with st.expander("🧩 家族相容矩陣", expanded=False):
+        # 只由 O 值查表計算，上千人也在微秒等級，每次重算即可
+        data = pds_core.compatibility_summary(o_values)
+        labels = pds_core.RELATION_LABELS
+
+        cols = st.columns(len(labels))
+        total_pairs = int(data["relation_counts"].sum()) or 1
+        for col, label, n in zip(cols, labels, data["relation_counts"]):
+            col.metric(label, f"{int(n) // 2} 對", f"{n / total_pairs:.0%}", delta_color="off")
+
+        n_kinds = len(labels)
+        # 離散色階：關係代碼 0..3 各佔一段顏色
+        colorscale = []
+        for k, color in enumerate(_COMPAT_COLORS):
+            colorscale += [[k / n_kinds, color], [(k + 1) / n_kinds, color]]
+
+        if len(all_profiles) <= COMPAT_MATRIX_MAX_MEMBERS:
+            names = [f"{p['name']} ({o})" for p, o in zip(all_profiles, o_values)]
+            matrix = pds_core.compatibility_matrix(o_values)
+            fig = go.Figure(go.Heatmap(
+                z=matrix, x=names, y=names, zmin=-0.5, zmax=n_kinds - 0.5, colorscale=colorscale,
+                text=[[labels[v] for v in row] for row in matrix], hovertemplate="%{y} → %{x}：%{text}<extra></extra>",
+                colorbar=dict(tickvals=list(range(n_kinds)), ticktext=list(labels)),
+            ))
+            fig.update_yaxes(autorange="reversed")
+        else:
+            # 人數多時：以 O 值分組 (1-9)，格子顏色為關係類型，數字為有序配對數
+            present = [o for o in range(1, 10) if data["o_counts"][o]]
+            table = pds_core.compatibility_matrix(present)
+            pairs = data["pair_counts"][present][:, present]
+            axis = [f"O={o} ({int(data['o_counts'][o])}人)" for o in present]
+            fig = go.Figure(go.Heatmap(
+                z=table, x=axis, y=axis, zmin=-0.5, zmax=n_kinds - 0.5, colorscale=colorscale,
+                text=pairs, texttemplate="%{text}", customdata=[[labels[v] for v in row] for row in table],
+                hovertemplate="%{y} → %{x}：%{customdata}，%{text} 組配對<extra></extra>",
+                colorbar=dict(tickvals=list(range(n_kinds)), ticktext=list(labels)),
+            ))
+            fig.update_yaxes(autorange="reversed")
+            st.caption(f"共 {len(all_profiles)} 位，依主性格 O 分組顯示 (格內數字為配對數)。")
+
+        fig.update_layout(height=min(900, 220 + 18 * len(fig.data[0].y)), margin=dict(l=10, r=10, t=10, b=10))
+        st.plotly_chart(fig, use_container_width=True)
 
 # --- 主渲染邏輯 ---
 def render(friends_raw=None):
@@ -239,6 +362,14 @@ def render(friends_raw=None):
         
     st.caption(f"目前等級：{user_tier} | 額度：{current_used} / {map_limit}")
 
+    if current_used:
+        _render_chart_export(line_id)
+
+    # 專業 / VIP 會員：整批匯出能量圖卡 (ZIP)
+    if clean_tier in ("pro", "vip"):
+        _render_card_export(all_profiles)
+        _render_bulk_import(line_id, all_profiles, map_limit, current_used)
+
     # ==========================================
     # 4. 動態生成分類選單
     # ==========================================
@@ -264,7 +395,6 @@ def render(friends_raw=None):
                 final_eng = new_eng.strip() if new_eng.strip() else get_wade_giles(new_name)
                 final_cat = new_cat_custom.strip() if new_cat_custom.strip() else new_cat_select
                 
-                from app import supabase
                 if supabase:
                     try:
                         current_username = st.session_state.get("username", "未知用戶")
@@ -276,6 +406,7 @@ def render(friends_raw=None):
                             "birth_date": str(new_bd),
                             "category": final_cat
                         }).execute()
+                        data_access.invalidate_saved_charts(line_id)
                         
                         st.success(f"✅ 已成功新增親友檔案：{new_name}")
                         import time; time.sleep(1); st.rerun()
@@ -307,6 +438,13 @@ def render(friends_raw=None):
     tab_titles = ["🌟 全部"] + [f"📂 {c}" for c in unique_cats]
     tabs = st.tabs(tab_titles)
 
+    # 一次批次算出所有人的主命數 (避免每顆按鈕各自跑 while 迴圈)
+    batch = pds_core.calculate_charts(
+        [p['birthdate'] for p in all_profiles],
+        [p.get('english_name', "") for p in all_profiles],
+    )
+    lpn_by_id = {p['id']: int(lpn) for p, lpn in zip(all_profiles, batch['lpn_single'])}
+
     # 3. 根據選中的分頁，過濾並顯示對應的按鈕
     for i, tab in enumerate(tabs):
         with tab:
@@ -325,9 +463,7 @@ def render(friends_raw=None):
             else:
                 cols = st.columns(4)
                 for idx, p in enumerate(display_profiles):
-                    # 計算主命數
-                    lpn = sum(int(d) for d in p['birthdate'].strftime("%Y%m%d"))
-                    while lpn > 9: lpn = sum(int(d) for d in str(lpn))
+                    lpn = lpn_by_id.get(p['id'])
                     
                     is_selected = (st.session_state.selected_profile_id == p['id'])
                     btn_type = "primary" if is_selected else "secondary"
@@ -344,6 +480,9 @@ def render(friends_raw=None):
                             st.session_state.selected_profile_id = p['id']
                             st.rerun()
 
+    # 家族相容矩陣 (依主性格 O 兩兩比對)
+    _render_compatibility(all_profiles, batch['O'])
+
     st.divider()
 
     # ==========================================
@@ -388,7 +527,6 @@ def render(friends_raw=None):
                             final_edit_eng = edit_eng.strip() if edit_eng.strip() else get_wade_giles(edit_name)
                             final_edit_cat = edit_cat_custom.strip() if edit_cat_custom.strip() else edit_cat_select
                             
-                            from app import supabase
                             if supabase:
                                 try:
                                     supabase.table("saved_charts").update({
@@ -397,6 +535,7 @@ def render(friends_raw=None):
                                         "birth_date": str(edit_bd),
                                         "category": final_edit_cat 
                                     }).eq("id", target_id).execute()
+                                    data_access.invalidate_saved_charts(line_id)
                                     st.success(f"✅ 已成功更新 {edit_name} 的資料！")
                                     import time; time.sleep(1); st.rerun()
                                 except Exception as e:
@@ -406,10 +545,10 @@ def render(friends_raw=None):
                         delete_confirm = st.checkbox("⚠️ 確認刪除此檔案 (打勾後再按刪除)")
                         if st.form_submit_button("🗑️ 刪除檔案", use_container_width=True):
                             if delete_confirm:
-                                from app import supabase
                                 if supabase:
                                     try:
                                         supabase.table("saved_charts").delete().eq("id", target_id).execute()
+                                        data_access.invalidate_saved_charts(line_id)
                                         st.session_state.selected_profile_id = "ME"
                                         st.success("✅ 檔案已徹底刪除！")
                                         import time; time.sleep(1); st.rerun()
@@ -486,8 +625,8 @@ def render(friends_raw=None):
             display_bd = target['birthdate']
             display_name = target['english_name']
 
-        # --- 計算能量數據 ---
-        chart = pds_core.calculate_chart(display_bd, display_name)
+        # --- 計算能量數據 (同一 session 共用快取) ---
+        chart = chart_cache.get_chart(display_bd, display_name)
         
         # --- 4 大分頁展示 ---
         t1, t2, t3, t4 = st.tabs(["本命盤 (核心)", "性情數字", "天賦三角形", "高峰與挑戰"])
@@ -537,7 +676,7 @@ def render(friends_raw=None):
         # [Tab 3] 天賦三角形
         with t3:
             st.markdown("##### 📐 能量幾何視圖")
-            svg_html = _draw_pyramid_svg(chart, display_bd)
+            svg_html = pyramid_svg.draw_pyramid_svg(chart, display_bd)
             st.markdown(svg_html, unsafe_allow_html=True)
             
             st.write("")
@@ -1,47 +1,117 @@
 import streamlit as st
 import datetime
-import os
-import time
-from supabase import create_client
+from views import data_access, write_behind
 
-# --- 資料庫連線 ---
-@st.cache_resource
-def init_connection():
-    url = os.environ.get("SUPABASE_URL") or st.secrets.get("supabase", {}).get("url")
-    key = os.environ.get("SUPABASE_KEY") or st.secrets.get("supabase", {}).get("key")
-    if url and key: return create_client(url, key)
-    return None
+# --- 資料庫連線 (全站共用 client) ---
+supabase = data_access.get_client()
+TZ_TW = datetime.timezone(datetime.timedelta(hours=8))
 
-supabase = init_connection()
+def _with_pending(rows, line_id):
+    """把還在寫入緩衝、尚未送到資料庫的新增 / 修改 / 刪除疊上去 (讀到自己剛寫的)"""
+    pending = write_behind.get_buffer(supabase).pending("journal_entries", line_id)
+    if not pending: return rows
+    new_rows = []
+    for p in pending:
+        if p["op"] == "insert":
+            created = datetime.datetime.fromtimestamp(p["created_at"], TZ_TW).isoformat()
+            new_rows.append({**p["row"], "id": p["key"], "created_at": created})
+    # 修改 / 刪除可能對應已存在的日記，也可能對應正在送出的新日記 (id 還是暫時 key)
+    by_id = {str(r.get("id")): r for r in rows + new_rows}
+    deleted = set()
+    for p in pending:
+        if p["op"] == "insert": continue
+        target_id = str((p["match"] or {}).get("id"))
+        if p["op"] == "delete":
+            deleted.add(target_id)
+        elif target_id in by_id:
+            by_id[target_id].update(p["row"])
+    return [r for r in new_rows[::-1] + rows if str(r.get("id")) not in deleted]
 
 # --- 資料存取函式 ---
-def fetch_journals():
-    """取得該使用者的所有日記 (認 ID)"""
-    if not supabase: return []
-    # 💡 修正 1：直接從 session_state 抓取永久 ID
-    line_id = st.session_state.get("line_user_id")
-    if not line_id: return []
-    
-    try:
+# 歷史紀錄分頁：依 (created_at, id) 由新到舊的 keyset 分頁 (不用 OFFSET，翻到第幾頁查詢成本都一樣)，
+# 順序與畫面顯示的日期一致，修改不會改變位置。看過的頁存在 session，rerun 不重查；
+# 還沒送出的寫入由 _with_pending 疊上去，寫入緩衝送到資料庫後只重讀受影響的幾筆、就地更新已載入的頁。
+JOURNAL_PAGE_SIZE = 20
+_PAGES_KEY = "_journal_pages"
+
+def _fetch_journal_page(line_id, cursor=None):
+    """取一頁日記 (多取 1 筆判斷是否還有下一頁)；cursor 為上一頁最後一筆的 (created_at, id)"""
+    query = supabase.table("journal_entries")\
+        .select("*")\
+        .eq("line_user_id", line_id)
+    if cursor:
+        created_at, last_id = cursor
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})')
+    res = query.order("created_at", desc=True)\
+        .order("id", desc=True)\
+        .limit(JOURNAL_PAGE_SIZE + 1)\
+        .execute()
+    rows = res.data or []
+    return rows[:JOURNAL_PAGE_SIZE], len(rows) > JOURNAL_PAGE_SIZE
+
+def _apply_flushed(pages, line_id, changes):
+    """把已送到資料庫的新增 / 修改 / 刪除套用到已載入的頁 (只重讀這幾筆，不重新翻頁)"""
+    deleted = {str(i) for op, i in changes if op == "delete"}
+    inserted = {str(i) for op, i in changes if op == "insert"} - deleted
+    refetch = [i for op, i in changes if op in ("insert", "update") and i is not None and str(i) not in deleted]
+    fresh = {}
+    if refetch:
         res = supabase.table("journal_entries")\
             .select("*")\
             .eq("line_user_id", line_id)\
-            .order("created_at", desc=True)\
+            .in_("id", list(dict.fromkeys(refetch)))\
             .execute()
-        return res.data
+        fresh = {str(r["id"]): r for r in res.data or []}
+    rows = [fresh.pop(str(r["id"]), r) for r in pages["rows"] if str(r["id"]) not in deleted]
+    # 新增的日記建立時間最新，排在最前面；其他沒載入過的 (較舊頁的修改) 等翻到那頁再讀
+    new_rows = sorted((r for rid, r in fresh.items() if rid in inserted),
+                      key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    pages["rows"] = new_rows + rows
+
+def fetch_journals(load_more=False):
+    """
+    取得該使用者已載入的日記 (認 ID)，回傳 (日記列表, 是否還有更早的)。
+    第一次只載入第一頁；load_more=True 時再往後載入一頁。
+    """
+    if not supabase: return [], False
+    # 💡 修正 1：直接從 session_state 抓取永久 ID
+    line_id = st.session_state.get("line_user_id")
+    if not line_id: return [], False
+
+    buffer = write_behind.get_buffer(supabase)
+    pages = st.session_state.get(_PAGES_KEY)
+    try:
+        if pages and pages["line_id"] == line_id and "flushed" in pages:
+            flushed, changes = buffer.flushed_since("journal_entries", line_id, pages["flushed"])
+            if changes is None: # 太久沒看，送出紀錄已被擠掉：整個重新讀取
+                pages = None
+            elif changes:
+                _apply_flushed(pages, line_id, changes)
+                pages["flushed"] = flushed
+        if not pages or pages["line_id"] != line_id or "flushed" not in pages:
+            # 先記下送出進度再讀第一頁：讀取期間才送達的寫入，下次會再套用一次 (結果相同)
+            pages = {"line_id": line_id, "rows": [], "cursor": None, "has_more": True,
+                     "flushed": buffer.flushed_count("journal_entries", line_id)}
+        if pages["has_more"] and (not pages["rows"] or load_more):
+            rows, has_more = _fetch_journal_page(line_id, pages["cursor"])
+            pages["rows"] = pages["rows"] + rows
+            pages["has_more"] = has_more
+            if rows:
+                pages["cursor"] = (rows[-1]["created_at"], rows[-1]["id"])
+        st.session_state[_PAGES_KEY] = pages
     except Exception as e:
         st.warning(f"讀取失敗: {e}")
-        return []
+        return [], False
+    return _with_pending([dict(r) for r in pages["rows"]], line_id), pages["has_more"]
 
 def save_journal(content, mood, emoji, entry_id=None):
-    """新增或更新日記 (同時儲存 ID 與 姓名)"""
+    """新增或更新日記 (同時儲存 ID 與 姓名)；先寫入本機緩衝立即返回，背景再送到資料庫"""
     if not supabase: return
     
     line_id = st.session_state.get("line_user_id")
     username = st.session_state.get("username") # 儲存當下的名字作為備份
     
-    tz_tw = datetime.timezone(datetime.timedelta(hours=8))
-    now = datetime.datetime.now(tz_tw).isoformat()
+    now = datetime.datetime.now(TZ_TW).isoformat()
     
     try:
         data = {
@@ -52,13 +122,19 @@ def save_journal(content, mood, emoji, entry_id=None):
             "emoji": emoji,
             "updated_at": now
         }
-        if entry_id: # 更新模式
+        buffer = write_behind.get_buffer(supabase)
+        if write_behind.is_pending_key(entry_id): # 剛寫的新日記又被修改：緩衝會併回新增，或改成比對送出後的 id
+            buffer.put(entry_id, "journal_entries", "update", data,
+                       match={"line_user_id": line_id}, line_user_id=line_id)
+            st.toast("✅ 日記已更新！")
+        elif entry_id: # 更新模式
             # 更新時也要確保是本人 (雙重鎖定：id + line_user_id)
-            supabase.table("journal_entries").update(data)\
-                .eq("id", entry_id).eq("line_user_id", line_id).execute()
+            buffer.put(f"journal_entries:{entry_id}", "journal_entries", "update", data,
+                       match={"id": entry_id, "line_user_id": line_id}, line_user_id=line_id)
             st.toast("✅ 日記已更新！")
         else: # 新增模式
-            supabase.table("journal_entries").insert(data).execute()
+            buffer.put(write_behind.new_pending_key("journal_entries"), "journal_entries", "insert", data,
+                       line_user_id=line_id)
             st.toast("🎉 新日記已儲存！")
     except Exception as e:
         st.error(f"儲存失敗: {e}")
@@ -68,12 +144,42 @@ def delete_journal(entry_id):
     if not supabase: return
     line_id = st.session_state.get("line_user_id")
     try:
-        supabase.table("journal_entries").delete()\
-            .eq("id", entry_id).eq("line_user_id", line_id).execute()
+        buffer = write_behind.get_buffer(supabase)
+        if write_behind.is_pending_key(entry_id): # 剛寫的新日記：還沒送出就從緩衝移除，已送出則比對送出後的 id
+            buffer.put(entry_id, "journal_entries", "delete", {},
+                       match={"line_user_id": line_id}, line_user_id=line_id)
+        else:
+            buffer.put(f"journal_entries:{entry_id}", "journal_entries", "delete", {},
+                       match={"id": entry_id, "line_user_id": line_id}, line_user_id=line_id)
         st.toast("🗑️ 日記已刪除")
     except Exception as e:
         st.error(f"刪除失敗: {e}")
 
+_FAILED_OP_LABELS = {"insert": "新日記", "update": "修改", "delete": "刪除"}
+
+def _render_failed_writes(line_id):
+    """重試多次仍送不進資料庫的寫入：明確告知使用者，讓他決定重試或捨棄 (不默默消失)"""
+    buffer = write_behind.get_buffer(supabase)
+    failed = buffer.dead_writes("journal_entries", line_id)
+    if not failed: return
+    st.error(f"⚠️ 有 {len(failed)} 筆日記變更沒有存進資料庫")
+    for f in failed:
+        content = f["row"].get("content") or ""
+        preview = content[:50].replace("\n", " ") + ("..." if len(content) > 50 else "")
+        with st.container(border=True):
+            c1, c2, c3 = st.columns([4, 1, 1])
+            with c1:
+                st.markdown(f"**{_FAILED_OP_LABELS.get(f['op'], f['op'])}** {f['row'].get('emoji', '')} {preview}")
+                st.caption(f"原因：{f['last_error'] or '未知'}")
+            with c2:
+                if st.button("🔁 重試", key=f"retry_{f['key']}"):
+                    buffer.retry(f["key"])
+                    st.rerun()
+            with c3:
+                if st.button("🗑️ 捨棄", key=f"discard_{f['key']}"):
+                    buffer.discard(f["key"])
+                    st.rerun()
+
 # --- 主渲染函式 ---
 def render():
     # 💡 修正 2：身分對位
@@ -87,7 +193,7 @@ def render():
     st.markdown(f"### 📔 {display_name} 的靈魂書寫：與內在對話")
 
     emoji_options = ["😀", "😃", "😄", "😆", "🥹", "😅", "😂", "🤣", "🥲", "☺️", "😊", "🥰", "😍", "😘", "😙", "😎", "😕", "🙁", "🙃", "🤩", "🥳", "😩", "😥", "🥶", "🥵", "😶‍🌫️", "🤕", "🤑"]
-    tz_tw = datetime.timezone(datetime.timedelta(hours=8))
+    tz_tw = TZ_TW
 
     if "journal_edit_id" not in st.session_state: st.session_state.journal_edit_id = None
     if "journal_content" not in st.session_state: st.session_state.journal_content = ""
@@ -127,7 +233,6 @@ def render():
         else:
             # 💡 修正 3：呼叫不帶 username (函式內會自取)
             save_journal(content, mood_val, selected_emoji, st.session_state.journal_edit_id)
-            time.sleep(1)
             st.session_state.journal_edit_id = None
             st.session_state.journal_content = ""
             st.rerun()
@@ -141,9 +246,10 @@ def render():
 
     st.divider()
     st.markdown("##### 🗂️ 歷史紀錄")
+    _render_failed_writes(line_id)
     
-    # 💡 修正 4：讀取函式簡化
-    journals = fetch_journals()
+    # 💡 修正 4：讀取函式簡化 (只載入已展開的頁數)
+    journals, has_more = fetch_journals()
     
     if not journals:
         st.caption("目前沒有日記，開始寫第一篇吧！")
@@ -172,4 +278,8 @@ def render():
                         st.session_state.journal_content = j['content']
                         st.session_state.journal_mood = saved_mood
                         st.session_state.journal_emoji = saved_emoji
-                        st.rerun()
\ No newline at end of file
+                        st.rerun()
+
+        if has_more and st.button("⬇️ 載入更早的日記", use_container_width=True):
+            fetch_journals(load_more=True)
+            st.rerun()
\ No newline at end of file
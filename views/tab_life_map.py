@@ -1,35 +1,22 @@
 import streamlit as st
 import datetime
-import os
 import time
-from supabase import create_client
-from pypinyin import pinyin, Style
+import pds_transliteration
 from views.permission_config import get_user_tier
-from views import life_map_ui
+from views import life_map_ui, data_access
 
 # --- 1. 資料庫與輔助函式 ---
-@st.cache_resource
-def init_connection():
-    url = os.environ.get("SUPABASE_URL") or st.secrets.get("supabase", {}).get("url")
-    key = os.environ.get("SUPABASE_KEY") or st.secrets.get("supabase", {}).get("key")
-    return create_client(url, key) if url and key else None
+supabase = data_access.get_client()
 
-supabase = init_connection()
-
-def _auto_generate_english_name(chinese_name):
-    if not chinese_name: return ""
-    try:
-        pinyin_list = pinyin(chinese_name, style=Style.WADEGILES, heteronym=False)
-        return " ".join([item[0].capitalize() for item in pinyin_list])
-    except: return ""
+# 中文名自動轉英文名：與註冊、家族矩陣同一套轉換 (大寫威妥瑪拼音)
+_auto_generate_english_name = pds_transliteration.to_wade_giles
 
 # --- 2. 資料存取函式 (核心：對準 line_user_id) ---
 def _get_my_profile(line_user_id): # ✅ 統一使用 line_user_id
     if not supabase: return None
     try:
-        res = supabase.table("users").select("*").eq("line_user_id", line_user_id).execute()
-        if res.data:
-            d = res.data[0]
+        d = data_access.fetch_user(line_user_id)
+        if d:
             bd = datetime.datetime.strptime(d['birth_date'], "%Y-%m-%d").date() if d.get('birth_date') else datetime.date(1983,9,8)
             return {"id": "ME", "name": d.get('full_name', "本人"), "english_name": d.get('english_name', ""), "birthdate": bd, "type": "me", "category": "本人"}
         return None
@@ -38,9 +25,8 @@ def _get_my_profile(line_user_id): # ✅ 統一使用 line_user_id
 def _get_saved_charts(line_user_id):
     if not supabase: return []
     try:
-        res = supabase.table("saved_charts").select("*").eq("line_user_id", line_user_id).order("created_at", desc=True).execute()
         data = []
-        for d in res.data:
+        for d in reversed(data_access.fetch_saved_charts(line_user_id)):
             bd = datetime.datetime.strptime(d['birth_date'], "%Y-%m-%d").date() if d.get('birth_date') else datetime.date(1990,1,1)
             data.append({"id": d['id'], "name": d['name'], "english_name": d.get('english_name', ""), "birthdate": bd, "type": "friend", "category": d.get('category', "未分類")})
         return data
@@ -54,10 +40,12 @@ def _save_chart(line_user_id, name, eng, bd, category, uid=None, is_me=False):
         if is_me:
             # ✅ 修正：這裡要用參數傳進來的 line_user_id
             supabase.table("users").upsert({"line_user_id": line_user_id, "full_name": name, "english_name": final_eng, "birth_date": bd_str}, on_conflict="line_user_id").execute()
+            data_access.invalidate_user(line_user_id)
         else:
             data_payload = {"line_user_id": line_user_id, "name": name, "english_name": final_eng, "birth_date": bd_str, "category": category or "未分類"}
             if uid: supabase.table("saved_charts").update(data_payload).eq("id", uid).execute()
             else: supabase.table("saved_charts").insert(data_payload).execute()
+            data_access.invalidate_saved_charts(line_user_id)
         st.toast("✅ 能量存檔成功")
     except Exception as e: st.error(f"💀 存檔失敗: {e}")
 
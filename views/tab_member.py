@@ -1,8 +1,7 @@
 import streamlit as st
 import datetime
-import os
 import time  
-from supabase import create_client
+from views import data_access
 
 # --- 核心權限對接 ---
 try:
@@ -57,15 +56,8 @@ def onboarding_popup():
             time.sleep(1)
             st.rerun()
             
-# --- 資料庫連線 (保持穩定) ---
-@st.cache_resource
-def init_connection():
-    url = os.environ.get("SUPABASE_URL") or st.secrets.get("supabase", {}).get("url")
-    key = os.environ.get("SUPABASE_KEY") or st.secrets.get("supabase", {}).get("key")
-    if url and key: return create_client(url, key)
-    return None
-
-supabase = init_connection()
+# --- 資料庫連線 (全站共用 client) ---
+supabase = data_access.get_client()
 
 # 🛠️ 修正 1：更新邏輯改用 line_user_id 鎖定
 def update_profile(line_user_id, full_name, eng_name, birth_date, email=None, phone=None):
@@ -84,6 +76,7 @@ def update_profile(line_user_id, full_name, eng_name, birth_date, email=None, ph
             data["phone"] = phone
         # 💡 關鍵：使用永久不變的 ID 作為過濾條件
         supabase.table("users").update(data).eq("line_user_id", line_user_id).execute()
+        data_access.invalidate_user(line_user_id)
         return True
     except Exception as e:
         st.error(f"更新失敗: {e}")
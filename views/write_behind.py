@@ -0,0 +1,415 @@
+# 檔案路徑: views/write_behind.py
+# 寫入緩衝 (write-behind)：抽牌紀錄、日記的寫入先存進本機 SQLite 就回覆畫面，
+# 背景執行緒再批次送到 Supabase (insert / upsert 合併成一次呼叫)，失敗以指數退避重試。
+# - 同一筆資料 (同一個 key) 在送出前被改了好幾次，只會送最後的版本
+# - 尚未送出的寫入存在磁碟，Streamlit 行程重啟後會接著送
+# - pending() 提供尚未送出的資料，讓畫面可以「讀到自己剛寫的」；flushed_since() 告訴畫面哪些資料列已送到資料庫
+# - 新增用暫時 key，送出後記下資料庫產生的 id；之後對暫時 key 的修改 / 刪除一律改成比對真正的 id
+# - 批次送出失敗時改逐筆重試，只有出錯的那筆退避 / 標記 dead，不拖累同一批其他人的資料
+# - 新增一律帶用戶端產生的 client_key (= 暫時 key)，以 upsert 忽略重複送出：逾時重送不會多出第二筆
+# - 放棄重試 (dead) 的寫入由 dead_writes() 提供給畫面顯示，使用者可以 retry() 或 discard()
+#
+# 經由緩衝新增資料的表需有 client_key 唯一鍵 (一次性)：
+#   alter table journal_entries add column client_key text unique;
+# 可調整的環境變數：WRITE_BEHIND_DB (預設 databases/write_behind.db)
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+DB_PATH = os.environ.get(
+    "WRITE_BEHIND_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "databases", "write_behind.db"),
+)
+FLUSH_INTERVAL = 1.0   # 背景執行緒最長的等待間隔 (秒)
+BATCH_SIZE = 200       # 每次最多取出的待送筆數
+LEASE_SECONDS = 60     # 取出後的鎖定時間；多個行程共用同一檔案時避免重複送出
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+MAX_ATTEMPTS = 20      # 超過就標記 dead，不再自動重試 (留在檔案中，畫面上可重試或捨棄)
+RESOLVED_TTL = 7 * 86400  # 暫時 key -> 真正 id 的對照保留時間 (秒)
+FLUSH_LOG_SIZE = 200   # 每位使用者每張表保留最近幾筆「已送出」紀錄，供畫面就地更新快取
+
+PENDING_KEY_PREFIX = "pending:"  # 尚未送出的新增資料，畫面上用這個當暫時 id
+CLIENT_KEY_COLUMN = "client_key"  # 新增資料的冪等鍵欄位 (值為暫時 key)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_writes (
+    key           TEXT PRIMARY KEY,
+    table_name    TEXT NOT NULL,
+    op            TEXT NOT NULL,          -- insert / upsert / update / delete
+    row           TEXT NOT NULL,
+    match         TEXT,
+    on_conflict   TEXT,
+    line_user_id  TEXT,
+    version       INTEGER NOT NULL DEFAULT 1,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    next_try_at   REAL NOT NULL,
+    leased_until  REAL NOT NULL DEFAULT 0,
+    dead          INTEGER NOT NULL DEFAULT 0,
+    last_error    TEXT,
+    created_at    REAL NOT NULL,
+    depends_on    TEXT                    -- 等這個暫時 key 的新增送出、拿到 id 後才送
+);
+CREATE INDEX IF NOT EXISTS idx_pending_due ON pending_writes (dead, next_try_at);
+CREATE INDEX IF NOT EXISTS idx_pending_user ON pending_writes (table_name, line_user_id);
+CREATE TABLE IF NOT EXISTS resolved_keys (
+    key           TEXT PRIMARY KEY,       -- 新增時的暫時 key
+    table_name    TEXT NOT NULL,
+    real_id       TEXT NOT NULL,          -- 資料庫產生的 id (JSON)
+    resolved_at   REAL NOT NULL
+);
+"""
+
+
+class _Unsendable(ValueError):
+    """無法安全送出的寫入 (例如沒有條件的 update / delete)：直接標記 dead，不重試"""
+
+
+def new_pending_key(table):
+    """新增資料用的暫時 key (也當作畫面上的暫時 id)"""
+    return f"{PENDING_KEY_PREFIX}{table}:{uuid.uuid4().hex}"
+
+
+def is_pending_key(value):
+    return isinstance(value, str) and value.startswith(PENDING_KEY_PREFIX)
+
+
+class WriteBehindBuffer:
+    def __init__(self, client, db_path=DB_PATH):
+        self.client = client
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self._flushed = {}    # (資料表, line_user_id) -> 本行程已送出的筆數
+        self._flush_log = {}  # (資料表, line_user_id) -> deque[(第幾筆, op, id)]
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(pending_writes)")}
+        if "depends_on" not in columns:  # 舊版建立的檔案
+            self._conn.execute("ALTER TABLE pending_writes ADD COLUMN depends_on TEXT")
+
+    # --- 寫入 (畫面執行緒呼叫，只碰本機 SQLite) ---
+    def put(self, key, table, op, row, match=None, on_conflict=None, line_user_id=None):
+        """
+        登記一筆寫入並立即返回。同一 key 尚未送出時會合併：
+        新增後又修改 -> 仍是一筆新增 (欄位以最新為準)；新增後又刪除 -> 兩筆都不送。
+        對暫時 key 的修改 / 刪除，若新增已送出或正在送出，改為另一筆比對真正 id 的寫入 (match 另加 id)。
+        update / delete 一定要有 match 條件，否則拋出 ValueError。
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                depends_on = None
+                if is_pending_key(key) and op in ("update", "delete"):
+                    routed = self._route_pending(key, table, op, row, match, now)
+                    if routed is None:
+                        conn.execute("COMMIT")
+                        return
+                    key, op, row, match, depends_on = routed
+                if op in ("update", "delete") and not match and not depends_on:
+                    raise _Unsendable(f"{table} 的 {op} 沒有指定 match 條件")
+                old = conn.execute("SELECT op, row FROM pending_writes WHERE key = ?", (key,)).fetchone()
+                if old and old["op"] == "update" and op == "update":
+                    row = {**json.loads(old["row"]), **row}
+                conn.execute(
+                    "INSERT INTO pending_writes (key, table_name, op, row, match, on_conflict, line_user_id,"
+                    " next_try_at, created_at, depends_on) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET op = excluded.op, row = excluded.row, match = excluded.match,"
+                    " on_conflict = excluded.on_conflict, version = version + 1, attempts = 0,"
+                    " next_try_at = excluded.next_try_at, leased_until = 0, dead = 0, last_error = NULL,"
+                    " depends_on = excluded.depends_on",
+                    (key, table, op, json.dumps(row, ensure_ascii=False),
+                     json.dumps(match, ensure_ascii=False) if match else None, on_conflict, line_user_id, now, now,
+                     depends_on),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self._wakeup.set()
+
+    def _route_pending(self, key, table, op, row, match, now):
+        """
+        對暫時 key 的 update / delete 該怎麼登記 -> (key, op, row, match, depends_on)；None 表示什麼都不用送。
+        - 新增還在緩衝、沒有在送：直接併進那筆新增 (或連同新增一起取消)
+        - 新增已送出：改成比對真正 id 的一般寫入
+        - 新增正在送出：另排一筆等它拿到 id (不動送出中的那筆，避免同一筆新增送兩次)
+        """
+        old = self._conn.execute(
+            "SELECT op, row, leased_until FROM pending_writes WHERE key = ?", (key,)).fetchone()
+        if old and old["op"] == "insert" and old["leased_until"] <= now:
+            if op == "delete":
+                self._conn.execute("DELETE FROM pending_writes WHERE key = ?", (key,))
+                return None
+            return key, "insert", {**json.loads(old["row"]), **row}, None, None
+        resolved = self._conn.execute("SELECT real_id FROM resolved_keys WHERE key = ?", (key,)).fetchone()
+        if resolved:
+            real_id = json.loads(resolved["real_id"])
+            return f"{table}:{real_id}", op, row, {**(match or {}), "id": real_id}, None
+        if old and old["op"] == "insert":
+            return f"{key}:after", op, row, match, key
+        raise _Unsendable(f"找不到 {key} 對應的資料 (新增可能已失敗)")
+
+    def pending(self, table, line_user_id):
+        """
+        尚未送出的寫入 (依登記時間排序)：[{key, op, row, match, created_at}]。
+        等待新增送出的修改 / 刪除，match 的 id 是真正的 id，還沒拿到時是暫時 key。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.key, p.op, p.row, p.match, p.created_at, p.depends_on, r.real_id FROM pending_writes p"
+                " LEFT JOIN resolved_keys r ON r.key = p.depends_on"
+                " WHERE p.table_name = ? AND p.line_user_id = ? AND p.dead = 0 ORDER BY p.created_at",
+                (table, line_user_id)).fetchall()
+        out = []
+        for r in rows:
+            match = json.loads(r["match"]) if r["match"] else None
+            if r["depends_on"]:
+                match = {**(match or {}), "id": json.loads(r["real_id"]) if r["real_id"] else r["depends_on"]}
+            out.append({"key": r["key"], "op": r["op"], "row": json.loads(r["row"]), "match": match,
+                        "created_at": r["created_at"]})
+        return out
+
+    def flushed_count(self, table, line_user_id):
+        """此使用者在這張表已送到資料庫的累計筆數 (給 flushed_since 當起點)"""
+        with self._lock:
+            return self._flushed.get((table, line_user_id), 0)
+
+    def flushed_since(self, table, line_user_id, count):
+        """
+        第 count 筆之後送到資料庫的寫入 -> (目前累計筆數, [(op, id)])，id 是資料庫的真正 id
+        (upsert 等沒有 id 的為 None)。紀錄已被擠掉時第二項為 None，畫面應整個重新讀取。
+        """
+        with self._lock:
+            scope = (table, line_user_id)
+            log = self._flush_log.get(scope, ())
+            if log and log[0][0] > count + 1:
+                return self._flushed[scope], None
+            return self._flushed.get(scope, 0), [(op, target_id) for n, op, target_id in log if n > count]
+
+    def dead_writes(self, table, line_user_id):
+        """
+        已放棄重試的寫入 (依登記時間排序)：[{key, op, row, match, created_at, last_error}]。
+        因為新增失敗而跟著放棄的修改 / 刪除不另外列出，隨那筆新增一起重試或捨棄。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, op, row, match, created_at, last_error FROM pending_writes"
+                " WHERE table_name = ? AND line_user_id = ? AND dead = 1"
+                " AND (depends_on IS NULL OR depends_on NOT IN (SELECT key FROM pending_writes WHERE dead = 1))"
+                " ORDER BY created_at", (table, line_user_id)).fetchall()
+        return [{"key": r["key"], "op": r["op"], "row": json.loads(r["row"]),
+                 "match": json.loads(r["match"]) if r["match"] else None, "created_at": r["created_at"],
+                 "last_error": r["last_error"]} for r in rows]
+
+    def retry(self, key):
+        """把放棄的寫入 (連同等它的修改 / 刪除) 放回佇列，立即重送"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pending_writes SET dead = 0, attempts = 0, next_try_at = ?, leased_until = 0, last_error = NULL"
+                " WHERE key = ? OR depends_on = ?", (time.time(), key, key))
+        self._wakeup.set()
+
+    def discard(self, key):
+        """捨棄放棄的寫入 (連同等它的修改 / 刪除)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pending_writes WHERE (key = ? OR depends_on = ?) AND dead = 1", (key, key))
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT dead, COUNT(*) AS n FROM pending_writes GROUP BY dead").fetchall()
+        return {("dead" if r["dead"] else "pending"): r["n"] for r in rows}
+
+    # --- 送出 (背景執行緒) ---
+    def _claim(self):
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT p.*, r.real_id FROM pending_writes p LEFT JOIN resolved_keys r ON r.key = p.depends_on"
+                    " WHERE p.dead = 0 AND p.next_try_at <= ? AND p.leased_until <= ?"
+                    " AND (p.depends_on IS NULL OR r.real_id IS NOT NULL)"
+                    " ORDER BY p.created_at LIMIT ?", (now, now, BATCH_SIZE)).fetchall()
+                conn.executemany("UPDATE pending_writes SET leased_until = ? WHERE key = ?",
+                                 [(now + LEASE_SECONDS, r["key"]) for r in rows])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        items = [dict(r) for r in rows]
+        for item in items:
+            if item["depends_on"]:  # 新增已拿到 id：補進比對條件
+                match = json.loads(item["match"]) if item["match"] else {}
+                item["match"] = json.dumps({**match, "id": json.loads(item["real_id"])}, ensure_ascii=False)
+        return items
+
+    def _done(self, items, real_ids=None):
+        # 只刪除「送出的那個版本」；送出期間又被改過的資料會留著下一輪再送
+        # real_ids：新增的 {暫時 key: 資料庫產生的 id}
+        now = time.time()
+        resolved, lost = [], []
+        for i in items:
+            if i["op"] != "insert" or not is_pending_key(i["key"]):
+                continue
+            real_id = (real_ids or {}).get(i["key"])
+            if real_id is None:
+                lost.append((f"新增後沒有拿到 {i['key']} 的 id", i["key"]))
+            else:
+                resolved.append((i["key"], i["table_name"], json.dumps(real_id), now))
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("DELETE FROM pending_writes WHERE key = ? AND version = ?",
+                                 [(i["key"], i["version"]) for i in items])
+                conn.executemany("INSERT OR REPLACE INTO resolved_keys (key, table_name, real_id, resolved_at)"
+                                 " VALUES (?, ?, ?, ?)", resolved)
+                conn.executemany("UPDATE pending_writes SET dead = 1, last_error = ? WHERE depends_on = ?", lost)
+                conn.execute("DELETE FROM resolved_keys WHERE resolved_at < ?", (now - RESOLVED_TTL,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            for i in items:
+                scope = (i["table_name"], i["line_user_id"])
+                n = self._flushed[scope] = self._flushed.get(scope, 0) + 1
+                if i["op"] == "insert":
+                    target_id = (real_ids or {}).get(i["key"])
+                else:
+                    target_id = (json.loads(i["match"]) if i["match"] else {}).get("id")
+                log = self._flush_log.setdefault(scope, collections.deque(maxlen=FLUSH_LOG_SIZE))
+                log.append((n, i["op"], target_id))
+
+    def _failed(self, items, error):
+        now = time.time()
+        params, orphans = [], []
+        for i in items:
+            attempts = i["attempts"] + 1
+            delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+            dead = attempts >= MAX_ATTEMPTS or isinstance(error, _Unsendable)
+            params.append((attempts, now + delay, int(dead), str(error)[:500], i["key"], i["version"]))
+            if dead and i["op"] == "insert":  # 新增放棄了，等它的修改 / 刪除也送不出去
+                orphans.append((f"依賴的新增已失敗: {error}"[:500], i["key"]))
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE pending_writes SET attempts = ?, next_try_at = ?, leased_until = 0, dead = ?, last_error = ?"
+                " WHERE key = ? AND version = ?", params)
+            self._conn.executemany("UPDATE pending_writes SET dead = 1, last_error = ? WHERE depends_on = ?", orphans)
+
+    def _send(self, table, op, on_conflict, items):
+        """送出同類的寫入 (update / delete 一次一筆)；insert 回傳 {暫時 key: 資料庫產生的 id}"""
+        rows = [json.loads(i["row"]) for i in items]
+        query = self.client.table(table)
+        if op == "insert":
+            return self._send_inserts(table, items, rows)
+        if op == "upsert":
+            query.upsert(rows, on_conflict=on_conflict, ignore_duplicates=True).execute()
+            return None
+        (item,) = items
+        match = json.loads(item["match"]) if item["match"] else {}
+        if not match:  # 沒有條件會改到 / 刪掉整張表
+            raise _Unsendable(f"{table} 的 {op} 沒有指定 match 條件")
+        query = query.update(rows[0]) if op == "update" else query.delete()
+        for column, value in match.items():
+            query = query.eq(column, value)
+        query.execute()
+        return None
+
+    def _send_inserts(self, table, items, rows):
+        """
+        以 client_key upsert 並忽略重複：上一次其實已寫入 (例如逾時) 時重送也不會多一筆。
+        被忽略的列不會出現在回傳中，它們的 id 另外以 client_key 查回。
+        """
+        keys = [i["key"] for i in items]
+        rows = [{**row, CLIENT_KEY_COLUMN: key} for row, key in zip(rows, keys)]
+        res = self.client.table(table).upsert(rows, on_conflict=CLIENT_KEY_COLUMN, ignore_duplicates=True).execute()
+        real_ids = {r.get(CLIENT_KEY_COLUMN): r.get("id") for r in (res.data or [])}
+        missing = [k for k in keys if real_ids.get(k) is None]
+        if missing:
+            res = self.client.table(table).select(f"id, {CLIENT_KEY_COLUMN}").in_(CLIENT_KEY_COLUMN, missing).execute()
+            real_ids.update({r[CLIENT_KEY_COLUMN]: r["id"] for r in (res.data or [])})
+        return real_ids
+
+    def flush(self):
+        """
+        送出一輪到期的寫入 (insert / upsert 依資料表合併成一次呼叫)；回傳成功筆數。
+        合併的那次失敗時改逐筆重送，只有出錯的那幾筆退避重試。
+        """
+        items = self._claim()
+        if not items: return 0
+        groups = {}
+        for item in items:
+            groups.setdefault((item["table_name"], item["op"], item["on_conflict"]), []).append(item)
+        sent = 0
+        for (table, op, on_conflict), group in groups.items():
+            if op in ("insert", "upsert") and len(group) > 1:
+                try:
+                    real_ids = self._send(table, op, on_conflict, group)
+                except Exception as e:
+                    print(f"⚠️ write-behind 批次送出失敗，改逐筆重送: {e}")
+                else:
+                    self._done(group, real_ids)
+                    sent += len(group)
+                    continue
+            for item in group:
+                try:
+                    real_ids = self._send(table, op, on_conflict, [item])
+                except Exception as e:
+                    self._failed([item], e)
+                    continue
+                self._done([item], real_ids)
+                sent += 1
+        return sent
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                sent = self.flush()
+            except Exception as e:
+                print(f"❌ write-behind 送出失敗: {e}")
+                sent = 0
+            if not sent:
+                self._wakeup.wait(FLUSH_INTERVAL)
+                self._wakeup.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer(client):
+    """整個行程共用一個緩衝與背景執行緒 (第一次呼叫時建立，並接手上次沒送完的資料)"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = WriteBehindBuffer(client).start()
+    return _buffer